@@ -1,16 +1,70 @@
+import gzip
 import networkx as nx
-import json
+import orjson
 import os
 import webbrowser
 import http.server
 import socketserver
 import threading
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+GRAPHML_NS = "{http://graphml.graphdrawing.org/xmlns}"
+GRAPHML_TYPES = {
+    "int": int,
+    "long": int,
+    "float": float,
+    "double": float,
+    "boolean": lambda v: v.strip().lower() in ("true", "1"),
+    "string": str,
+}
+
+
+# stream the GraphML file and emit node-link data without building a networkx graph
+def _iterparse_graphml(graphml_file):
+    keys, nodes, links = {}, [], []
+    for _, el in etree.iterparse(
+        graphml_file,
+        events=("end",),
+        tag=(f"{GRAPHML_NS}key", f"{GRAPHML_NS}node", f"{GRAPHML_NS}edge"),
+        huge_tree=True,
+    ):
+        if el.tag == f"{GRAPHML_NS}key":
+            keys[el.get("id")] = (
+                el.get("attr.name"),
+                GRAPHML_TYPES.get(el.get("attr.type"), str),
+            )
+            continue
+        if el.tag == f"{GRAPHML_NS}node":
+            item = {"id": el.get("id")}
+            nodes.append(item)
+        else:
+            item = {"source": el.get("source"), "target": el.get("target")}
+            links.append(item)
+        for data in el.iterchildren(f"{GRAPHML_NS}data"):
+            name, cast = keys.get(data.get("key"), (data.get("key"), str))
+            item[name] = cast(data.text or "")
+        # free the parsed elements, iterparse otherwise keeps the whole tree around
+        el.clear()
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+    return {"nodes": nodes, "links": links}
+
+
 # load GraphML file and transfer to JSON
 def graphml_to_json(graphml_file):
-    G = nx.read_graphml(graphml_file)
-    data = nx.node_link_data(G)
-    return json.dumps(data)
+    if etree is not None:
+        data = _iterparse_graphml(graphml_file)
+    else:
+        G = nx.read_graphml(graphml_file)
+        data = nx.node_link_data(G)
+        # networkx>=3.6 names the edge list "edges", the page reads "links"
+        if "edges" in data:
+            data["links"] = data.pop("edges")
+    return data
 
 
 # create HTML file
@@ -23,6 +77,7 @@ def create_html(html_path):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Graph Visualization</title>
     <script src="https://d3js.org/d3.v7.min.js"></script>
+    <script src="https://pixijs.download/v7.4.2/pixi.min.js"></script>
     <style>
         body, html {
             margin: 0;
@@ -31,31 +86,8 @@ def create_html(html_path):
             height: 100%;
             overflow: hidden;
         }
-        svg {
-            width: 100%;
-            height: 100%;
-        }
-        .links line {
-            stroke: #999;
-            stroke-opacity: 0.6;
-        }
-        .nodes circle {
-            stroke: #fff;
-            stroke-width: 1.5px;
-        }
-        .node-label {
-            font-size: 12px;
-            pointer-events: none;
-        }
-        .link-label {
-            font-size: 10px;
-            fill: #666;
-            pointer-events: none;
-            opacity: 0;
-            transition: opacity 0.3s;
-        }
-        .link:hover .link-label {
-            opacity: 1;
+        canvas {
+            display: block;
         }
         .tooltip {
             position: absolute;
@@ -91,78 +123,198 @@ def create_html(html_path):
     </style>
 </head>
 <body>
-    <svg></svg>
     <div class="tooltip"></div>
     <div class="legend"></div>
     <script type="text/javascript" src="./graph_json.js"></script>
+    <script type="javascript/worker" id="layout-worker">
+        // runs d3-force off the main thread and streams the positions back
+        importScripts("https://d3js.org/d3.v7.min.js");
+
+        let nodes, simulation, shared;
+
+        self.onmessage = event => {
+            const msg = event.data;
+            if (msg.type === "init") {
+                nodes = Array.from({length: msg.nodeCount}, () => ({}));
+                shared = msg.shared ? new Float32Array(msg.shared) : null;
+                // a looser Barnes-Hut theta and a cutoff on long-range repulsion keep the
+                // many-body force cheap, a faster alpha decay settles in ~135 ticks instead of ~300
+                simulation = d3.forceSimulation(nodes)
+                    .force("link", d3.forceLink(msg.links).distance(150))
+                    .force("charge", d3.forceManyBody().strength(-300).theta(0.95).distanceMax(500))
+                    .force("center", d3.forceCenter(msg.width / 2, msg.height / 2))
+                    .force("collide", d3.forceCollide().radius(30))
+                    .alphaDecay(0.05)
+                    .on("tick", postPositions)
+                    .on("end", () => simulation.stop());
+            } else if (msg.type === "dragstart") {
+                if (!msg.active) simulation.alphaTarget(0.3).restart();
+                nodes[msg.index].fx = msg.x;
+                nodes[msg.index].fy = msg.y;
+            } else if (msg.type === "drag") {
+                nodes[msg.index].fx = msg.x;
+                nodes[msg.index].fy = msg.y;
+            } else if (msg.type === "dragend") {
+                if (!msg.active) simulation.alphaTarget(0);
+                nodes[msg.index].fx = null;
+                nodes[msg.index].fy = null;
+            }
+        };
+
+        function postPositions() {
+            const positions = shared || new Float32Array(2 * nodes.length);
+            nodes.forEach((d, i) => {
+                positions[2 * i] = d.x;
+                positions[2 * i + 1] = d.y;
+            });
+            if (shared) {
+                self.postMessage({type: "tick"});
+            } else {
+                // hand the buffer over instead of copying it
+                self.postMessage({type: "tick", positions}, [positions.buffer]);
+            }
+        }
+    </script>
     <script>
         const graphData = graphJson;
-        
-        const svg = d3.select("svg"),
-            width = window.innerWidth,
+
+        const width = window.innerWidth,
             height = window.innerHeight;
 
-        svg.attr("viewBox", [0, 0, width, height]);
+        // render with WebGL, SVG stalls once the graph has a few thousand elements
+        const app = new PIXI.Application({
+            resizeTo: window,
+            backgroundColor: 0xffffff,
+            antialias: true,
+            resolution: window.devicePixelRatio || 1,
+            autoDensity: true,
+            // only render when something moved, see requestRender
+            autoStart: false,
+        });
+        document.body.prepend(app.view);
+
+        let renderPending = false;
+        function requestRender() {
+            if (renderPending) return;
+            renderPending = true;
+            requestAnimationFrame(() => {
+                renderPending = false;
+                app.render();
+            });
+        }
+        window.addEventListener("resize", requestRender);
 
-        const g = svg.append("g");
+        const viewport = new PIXI.Container();
+        app.stage.addChild(viewport);
 
         const entityTypes = [...new Set(graphData.nodes.map(d => d.entity_type))];
         const color = d3.scaleOrdinal(d3.schemeCategory10).domain(entityTypes);
 
-        const simulation = d3.forceSimulation(graphData.nodes)
-            .force("link", d3.forceLink(graphData.links).id(d => d.id).distance(150))
-            .force("charge", d3.forceManyBody().strength(-300))
-            .force("center", d3.forceCenter(width / 2, height / 2))
-            .force("collide", d3.forceCollide().radius(30));
-
-        const linkGroup = g.append("g")
-            .attr("class", "links")
-            .selectAll("g")
-            .data(graphData.links)
-            .enter().append("g")
-            .attr("class", "link");
-
-        const link = linkGroup.append("line")
-            .attr("stroke-width", d => Math.sqrt(d.value));
-
-        const linkLabel = linkGroup.append("text")
-            .attr("class", "link-label")
-            .text(d => d.description || "");
-
-        const node = g.append("g")
-            .attr("class", "nodes")
-            .selectAll("circle")
-            .data(graphData.nodes)
-            .enter().append("circle")
-            .attr("r", 5)
-            .attr("fill", d => color(d.entity_type))
-            .call(d3.drag()
-                .on("start", dragstarted)
-                .on("drag", dragged)
-                .on("end", dragended));
+        // the layout only needs node indices, links are resolved to them once here
+        const nodeIndex = new Map(graphData.nodes.map((d, i) => [d.id, i]));
+        const links = graphData.links.map(d => ({
+            source: nodeIndex.get(d.source),
+            target: nodeIndex.get(d.target),
+            width: Math.sqrt(d.value) || 1,
+        }));
+
+        // x, y of node i are at 2 * i, 2 * i + 1; shared with the worker when the page
+        // is cross-origin isolated, otherwise a fresh buffer is transferred every tick
+        const nodeCount = graphData.nodes.length;
+        const shared = self.crossOriginIsolated ? new SharedArrayBuffer(8 * nodeCount) : null;
+        let positions = shared ? new Float32Array(shared) : null;
+
+        const workerSource = document.getElementById("layout-worker").textContent;
+        const worker = new Worker(URL.createObjectURL(new Blob([workerSource], {type: "text/javascript"})));
+        worker.onmessage = event => {
+            if (event.data.positions) positions = event.data.positions;
+            ticked();
+        };
+        worker.postMessage({
+            type: "init",
+            nodeCount,
+            links: links.map(d => ({source: d.source, target: d.target})),
+            width,
+            height,
+            shared,
+        });
+
+        // all links are redrawn into a single Graphics object per tick
+        const linkGfx = new PIXI.Graphics();
+        viewport.addChild(linkGfx);
+
+        // nodes share one white circle texture, tinted by entity type
+        const nodeRadius = 5;
+        const circle = new PIXI.Graphics()
+            .beginFill(0xffffff)
+            .drawCircle(0, 0, nodeRadius)
+            .endFill();
+        const nodeTexture = app.renderer.generateTexture(circle, {
+            resolution: 4,
+        });
+        const nodeContainer = new PIXI.ParticleContainer(graphData.nodes.length, {
+            position: true,
+            tint: true,
+        });
+        viewport.addChild(nodeContainer);
+
+        const nodeSprites = graphData.nodes.map(d => {
+            const sprite = new PIXI.Sprite(nodeTexture);
+            sprite.anchor.set(0.5);
+            sprite.tint = new PIXI.Color(color(d.entity_type)).toNumber();
+            nodeContainer.addChild(sprite);
+            return sprite;
+        });
 
-        const nodeLabel = g.append("g")
-            .attr("class", "node-labels")
-            .selectAll("text")
-            .data(graphData.nodes)
-            .enter().append("text")
-            .attr("class", "node-label")
-            .text(d => d.id);
+        // one text object per node is too heavy for large graphs, those only label on hover
+        const maxLabeledNodes = 2000;
+        const nodeLabels = graphData.nodes.length > maxLabeledNodes ? [] : graphData.nodes.map(d => {
+            const label = new PIXI.Text(d.id, {
+                fontFamily: "sans-serif",
+                fontSize: 12,
+                fill: 0x000000,
+            });
+            label.anchor.set(0, 0.5);
+            viewport.addChild(label);
+            return label;
+        });
 
         const tooltip = d3.select(".tooltip");
+        let transform = d3.zoomIdentity;
+
+        // rebuilt lazily after the positions change, only when the pointer needs it
+        let tree = null;
+        function findNode(event) {
+            if (!positions) return undefined;
+            if (!tree) {
+                tree = d3.quadtree(d3.range(nodeCount), i => positions[2 * i], i => positions[2 * i + 1]);
+            }
+            const [x, y] = transform.invert(d3.pointer(event, app.view));
+            const i = tree.find(x, y, (nodeRadius + 3) / transform.k);
+            return i === undefined ? undefined : graphData.nodes[i];
+        }
 
-        node.on("mouseover", function(event, d) {
-            tooltip.transition()
-                .duration(200)
-                .style("opacity", .9);
+        let hovered = null;
+        app.view.addEventListener("pointermove", event => {
+            const d = findNode(event);
+            if (!d) {
+                if (hovered) {
+                    tooltip.transition()
+                        .duration(500)
+                        .style("opacity", 0);
+                }
+                hovered = null;
+                return;
+            }
+            if (d !== hovered) {
+                tooltip.transition()
+                    .duration(200)
+                    .style("opacity", .9);
+            }
+            hovered = d;
             tooltip.html(`<strong>${d.id}</strong><br>Entity Type: ${d.entity_type}<br>Description: ${d.description || "N/A"}`)
                 .style("left", (event.pageX + 10) + "px")
                 .style("top", (event.pageY - 28) + "px");
-        })
-        .on("mouseout", function(d) {
-            tooltip.transition()
-                .duration(500)
-                .style("opacity", 0);
         });
 
         const legend = d3.select(".legend");
@@ -172,60 +324,62 @@ def create_html(html_path):
                 .html(`<span class="legend-color" style="background-color: ${color(type)}"></span>${type}`);
         });
 
-        simulation
-            .nodes(graphData.nodes)
-            .on("tick", ticked);
-
-        simulation.force("link")
-            .links(graphData.links);
-
         function ticked() {
-            link
-                .attr("x1", d => d.source.x)
-                .attr("y1", d => d.source.y)
-                .attr("x2", d => d.target.x)
-                .attr("y2", d => d.target.y);
-
-            linkLabel
-                .attr("x", d => (d.source.x + d.target.x) / 2)
-                .attr("y", d => (d.source.y + d.target.y) / 2)
-                .attr("text-anchor", "middle")
-                .attr("dominant-baseline", "middle");
-
-            node
-                .attr("cx", d => d.x)
-                .attr("cy", d => d.y);
-
-            nodeLabel
-                .attr("x", d => d.x + 8)
-                .attr("y", d => d.y + 3);
+            tree = null;
+            linkGfx.clear();
+            links.forEach(d => {
+                linkGfx.lineStyle(d.width, 0x999999, 0.6);
+                linkGfx.moveTo(positions[2 * d.source], positions[2 * d.source + 1]);
+                linkGfx.lineTo(positions[2 * d.target], positions[2 * d.target + 1]);
+            });
+
+            nodeSprites.forEach((sprite, i) => {
+                sprite.position.set(positions[2 * i], positions[2 * i + 1]);
+            });
+
+            nodeLabels.forEach((label, i) => {
+                label.position.set(positions[2 * i] + 8, positions[2 * i + 1]);
+            });
+            requestRender();
+        }
+
+        function dragsubject(event) {
+            const d = findNode(event.sourceEvent);
+            return d && {index: nodeIndex.get(d.id)};
         }
 
         function dragstarted(event) {
-            if (!event.active) simulation.alphaTarget(0.3).restart();
-            event.subject.fx = event.subject.x;
-            event.subject.fy = event.subject.y;
+            const [x, y] = transform.invert(d3.pointer(event, app.view));
+            worker.postMessage({type: "dragstart", index: event.subject.index, active: event.active, x, y});
         }
 
         function dragged(event) {
-            event.subject.fx = event.x;
-            event.subject.fy = event.y;
+            const [x, y] = transform.invert(d3.pointer(event, app.view));
+            worker.postMessage({type: "drag", index: event.subject.index, x, y});
         }
 
         function dragended(event) {
-            if (!event.active) simulation.alphaTarget(0);
-            event.subject.fx = null;
-            event.subject.fy = null;
+            worker.postMessage({type: "dragend", index: event.subject.index, active: event.active});
         }
 
         const zoom = d3.zoom()
             .scaleExtent([0.1, 10])
             .on("zoom", zoomed);
 
-        svg.call(zoom);
+        // drag is bound first so it takes the pointer when a node is hit, otherwise zoom pans
+        d3.select(app.view)
+            .call(d3.drag()
+                .subject(dragsubject)
+                .on("start", dragstarted)
+                .on("drag", dragged)
+                .on("end", dragended))
+            .call(zoom);
 
         function zoomed(event) {
-            g.attr("transform", event.transform);
+            transform = event.transform;
+            viewport.position.set(transform.x, transform.y);
+            viewport.scale.set(transform.k);
+            requestRender();
         }
 
     </script>
@@ -238,42 +392,69 @@ def create_html(html_path):
 
 
 def create_json(json_data, json_path):
-    json_data = "var graphJson = " + json_data.replace('\\"', '').replace("'", "\\'").replace("\n", "")
-    with open(json_path, 'w', encoding='utf-8') as f:
-        f.write(json_data)
-
-
-# start simple HTTP server
+    # JSON is a valid JS expression, so it can be assigned as is without any escaping
+    payload = b"var graphJson = " + orjson.dumps(json_data) + b";"
+    with open(json_path, 'wb') as f:
+        f.write(payload)
+    # precompressed copy, served by GzipRequestHandler to browsers that accept gzip
+    with open(json_path + '.gz', 'wb') as f:
+        f.write(gzip.compress(payload, compresslevel=6))
+
+
+class GzipRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve `<file>.js.gz` with `Content-Encoding: gzip` in place of `<file>.js` when it exists"""
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if (
+            path.endswith('.js')
+            and os.path.isfile(path + '.gz')
+            and 'gzip' in self.headers.get('Accept-Encoding', '')
+        ):
+            f = open(path + '.gz', 'rb')
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return f
+        return super().send_head()
+
+
+# start simple HTTP server in background
 def start_server(port):
-    handler = http.server.SimpleHTTPRequestHandler
-    with socketserver.TCPServer(("", port), handler) as httpd:
-        print(f"Server started at http://localhost:{port}")
-        httpd.serve_forever()
+    handler = GzipRequestHandler
+    httpd = socketserver.TCPServer(("", port), handler)
+    server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    server_thread.start()
+    print(f"Server started at http://localhost:{port}")
+    return httpd
 
 # main function
 def visualize_graphml(graphml_file, html_path, port=8000):
     json_data = graphml_to_json(graphml_file)
     html_dir = os.path.dirname(html_path)
-    if not os.path.exists(html_dir):
+    if html_dir and not os.path.exists(html_dir):
         os.makedirs(html_dir)
     json_path = os.path.join(html_dir, 'graph_json.js')
     create_json(json_data, json_path)
     create_html(html_path)
-    # start server in background
-    server_thread = threading.Thread(target=start_server(port))
-    server_thread.daemon = True
-    server_thread.start()
+    httpd = start_server(port)
     
     # open default browser
     webbrowser.open(f'http://localhost:{port}/{html_path}')
     
     print("Visualization is ready. Press Ctrl+C to exit.")
     try:
-        # keep main thread running
-        while True:
+        # keep main thread idle until Ctrl+C, an untimed wait isn't interruptible on Windows
+        stop = threading.Event()
+        while not stop.wait(1):
             pass
     except KeyboardInterrupt:
         print("Shutting down...")
+        httpd.shutdown()
+        httpd.server_close()
 
 # usage
 if __name__ == "__main__":
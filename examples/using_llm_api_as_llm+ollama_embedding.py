@@ -115,7 +115,7 @@ async def ollama_embedding(texts :list[str]) -> np.ndarray:
       data = ollama.embeddings(model=EMBEDDING_MODEL, prompt=text)
       embed_text.append(data["embedding"])
     
-    return embed_text
+    return np.asarray(embed_text, dtype=np.float32)
 
 if __name__ == "__main__":
     insert()
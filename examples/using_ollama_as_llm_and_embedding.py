@@ -1,5 +1,6 @@
 import os
 import sys
+import asyncio
 
 sys.path.append("..")
 import logging
@@ -19,6 +20,7 @@ MODEL = "your_model_name"
 EMBEDDING_MODEL = "nomic-embed-text"
 EMBEDDING_MODEL_DIM = 768
 EMBEDDING_MODEL_MAX_TOKENS = 8192
+EMBEDDING_MAX_CONCURRENCY = 16
 
 
 async def ollama_model_if_cache(
@@ -107,12 +109,22 @@ def insert():
     max_token_size=EMBEDDING_MODEL_MAX_TOKENS,
 )
 async def ollama_embedding(texts: list[str]) -> np.ndarray:
-    embed_text = []
-    for text in texts:
-        data = ollama.embeddings(model=EMBEDDING_MODEL, prompt=text)
-        embed_text.append(data["embedding"])
+    ollama_client = ollama.AsyncClient()
+    if hasattr(ollama_client, "embed"):
+        # ollama>=0.3 embeds the whole batch in a single /api/embed round trip
+        data = await ollama_client.embed(model=EMBEDDING_MODEL, input=texts)
+        return np.asarray(data["embeddings"], dtype=np.float32)
+
+    # older ollama only embeds one prompt per request, so at least run them concurrently
+    semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+
+    async def _embed_one(text: str) -> list[float]:
+        async with semaphore:
+            data = await ollama_client.embeddings(model=EMBEDDING_MODEL, prompt=text)
+        return data["embedding"]
 
-    return embed_text
+    embed_text = await asyncio.gather(*[_embed_one(text) for text in texts])
+    return np.asarray(embed_text, dtype=np.float32)
 
 
 if __name__ == "__main__":
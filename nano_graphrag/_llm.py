@@ -1,9 +1,21 @@
+import asyncio
+import base64
+import importlib.util
 import json
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
 import numpy as np
 from typing import Optional, List, Any, Callable
 
 import aioboto3
-from openai import AsyncOpenAI, AsyncAzureOpenAI, APIConnectionError, RateLimitError
+import httpx
+from openai import (
+    AsyncOpenAI,
+    AsyncAzureOpenAI,
+    APIConnectionError,
+    DefaultAsyncHttpxClient,
+    RateLimitError,
+)
 
 from tenacity import (
     retry,
@@ -13,25 +25,55 @@ from tenacity import (
 )
 import os
 
-from ._utils import compute_args_hash, wrap_embedding_func_with_attrs
+from ._utils import (
+    EmbeddingFunc,
+    compute_args_hash,
+    cosine_similarity,
+    quantize_int8,
+    wrap_embedding_func_with_attrs,
+)
 from .base import BaseKVStorage
 
 global_openai_async_client = None
 global_azure_openai_async_client = None
 global_amazon_bedrock_async_client = None
+# entered bedrock-runtime clients with their exit stacks and creation locks, per event loop,
+# aiohttp sessions and asyncio locks can't be shared across loops
+global_amazon_bedrock_runtimes: dict[asyncio.AbstractEventLoop, tuple[Any, AsyncExitStack]] = {}
+global_amazon_bedrock_runtime_locks: dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+
+# GraphRAG fires bursts of concurrent LLM/embedding calls (see `best_model_max_async`),
+# keep enough warm connections around so they don't redo TCP/TLS handshakes.
+HTTPX_CONNECTION_LIMITS = httpx.Limits(
+    max_connections=256, max_keepalive_connections=256, keepalive_expiry=60
+)
+# Max in-flight titan `invoke_model` requests issued by a single embedding batch
+AMAZON_BEDROCK_EMBEDDING_MAX_ASYNC = 16
+
+
+def _create_openai_http_client() -> httpx.AsyncClient:
+    return DefaultAsyncHttpxClient(
+        limits=HTTPX_CONNECTION_LIMITS,
+        # HTTP/2 multiplexing needs the optional `h2` package (pip install httpx[http2])
+        http2=importlib.util.find_spec("h2") is not None,
+    )
 
 
 def get_openai_async_client_instance():
     global global_openai_async_client
     if global_openai_async_client is None:
-        global_openai_async_client = AsyncOpenAI()
+        global_openai_async_client = AsyncOpenAI(
+            http_client=_create_openai_http_client()
+        )
     return global_openai_async_client
 
 
 def get_azure_openai_async_client_instance():
     global global_azure_openai_async_client
     if global_azure_openai_async_client is None:
-        global_azure_openai_async_client = AsyncAzureOpenAI()
+        global_azure_openai_async_client = AsyncAzureOpenAI(
+            http_client=_create_openai_http_client()
+        )
     return global_azure_openai_async_client
 
 
@@ -42,36 +84,139 @@ def get_amazon_bedrock_async_client_instance():
     return global_amazon_bedrock_async_client
 
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
-)
-async def openai_complete_if_cache(
-    model, prompt, system_prompt=None, history_messages=[], **kwargs
+async def get_amazon_bedrock_runtime_instance():
+    """Enter the bedrock-runtime client once per event loop and reuse it, building it loads botocore service models and signers"""
+    loop = asyncio.get_running_loop()
+    if loop in global_amazon_bedrock_runtimes:
+        return global_amazon_bedrock_runtimes[loop][0]
+    # forget the clients of loops that were closed without close_amazon_bedrock_runtime()
+    for closed_loop in [l for l in global_amazon_bedrock_runtime_locks if l.is_closed()]:
+        global_amazon_bedrock_runtimes.pop(closed_loop, None)
+        global_amazon_bedrock_runtime_locks.pop(closed_loop)
+    lock = global_amazon_bedrock_runtime_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if loop not in global_amazon_bedrock_runtimes:
+            amazon_bedrock_async_client = get_amazon_bedrock_async_client_instance()
+            exit_stack = AsyncExitStack()
+            bedrock_runtime = await exit_stack.enter_async_context(
+                amazon_bedrock_async_client.client(
+                    "bedrock-runtime",
+                    region_name=os.getenv("AWS_REGION", "us-east-1"),
+                )
+            )
+            global_amazon_bedrock_runtimes[loop] = (bedrock_runtime, exit_stack)
+    return global_amazon_bedrock_runtimes[loop][0]
+
+
+async def close_amazon_bedrock_runtime():
+    """Close the bedrock-runtime client of the running event loop, if one was entered"""
+    loop = asyncio.get_running_loop()
+    global_amazon_bedrock_runtime_locks.pop(loop, None)
+    _, exit_stack = global_amazon_bedrock_runtimes.pop(loop, (None, None))
+    if exit_stack is not None:
+        await exit_stack.aclose()
+
+
+def _decode_base64_embeddings(data) -> np.ndarray:
+    """Decode `encoding_format="base64"` embeddings, each one is a packed little-endian float32 buffer"""
+    return np.stack(
+        [np.frombuffer(base64.b64decode(dp.embedding), dtype="<f4") for dp in data]
+    ).astype(np.float32, copy=False)
+
+
+@dataclass
+class SemanticCache:
+    """Reuse the response of an earlier prompt whose embedding is close enough (cosine) to the new one.
+
+    Prompts are only compared within the same scope (model, system prompt and history),
+    so a cached answer is never reused for a different context.
+    Set quantize="int8" to keep the prompt embeddings as int8 codes (4x less memory, ~1% recall loss).
+    """
+
+    embedding_func: EmbeddingFunc
+    similarity_threshold: float = 0.95
+    quantize: Optional[str] = None
+    _scopes: dict = field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self):
+        if self.quantize not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization {self.quantize}")
+
+    async def embed_prompt(self, prompt: str) -> np.ndarray:
+        embedding = np.asarray((await self.embedding_func([prompt]))[0], dtype=np.float32)
+        if self.quantize == "int8":
+            embedding = quantize_int8(embedding)[0][0]
+        return embedding
+
+    def lookup(self, scope: str, embedding: np.ndarray) -> Optional[str]:
+        if scope not in self._scopes:
+            return None
+        matrix, responses = self._scopes[scope]
+        similarities = cosine_similarity(embedding, matrix[: len(responses)])
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return responses[best]
+        return None
+
+    def insert(self, scope: str, embedding: np.ndarray, response: str):
+        matrix, responses = self._scopes.get(
+            scope, (np.empty((0, embedding.shape[0]), dtype=embedding.dtype), [])
+        )
+        if len(responses) == matrix.shape[0]:
+            # grow by doubling, so inserting n prompts only copies O(n) rows in total
+            grown = np.empty(
+                (max(2 * len(responses), 16), matrix.shape[1]), dtype=matrix.dtype
+            )
+            grown[: len(responses)] = matrix
+            matrix = grown
+        matrix[len(responses)] = embedding
+        responses.append(response)
+        self._scopes[scope] = (matrix, responses)
+
+
+async def _cached_chat(
+    provider_call, model, prompt, system_prompt=None, history_messages=[], **kwargs
 ) -> str:
-    openai_async_client = get_openai_async_client_instance()
+    """Run `provider_call(model, prompt, system_prompt, history_messages, **kwargs)` behind the LLM caches.
+
+    The exact cache (`hashing_kv`) is probed with the raw arguments before the provider builds
+    any messages, then the opt-in `semantic_cache`; fresh responses are stored back into both.
+    """
     hashing_kv: BaseKVStorage = kwargs.pop("hashing_kv", None)
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.extend(history_messages)
-    messages.append({"role": "user", "content": prompt})
+    semantic_cache: SemanticCache = kwargs.pop("semantic_cache", None)
     if hashing_kv is not None:
-        args_hash = compute_args_hash(model, messages)
+        args_hash = compute_args_hash(model, system_prompt, history_messages, prompt)
         if_cache_return = await hashing_kv.get_by_id(args_hash)
         if if_cache_return is not None:
             return if_cache_return["return"]
+    if semantic_cache is not None:
+        semantic_scope = compute_args_hash(model, system_prompt, history_messages)
+        prompt_embedding = await semantic_cache.embed_prompt(prompt)
+        result = semantic_cache.lookup(semantic_scope, prompt_embedding)
+        if result is not None:
+            # a near-duplicate's answer, not an exact one, keep it out of `hashing_kv`
+            return result
+
+    result = await provider_call(model, prompt, system_prompt, history_messages, **kwargs)
+
+    if semantic_cache is not None:
+        semantic_cache.insert(semantic_scope, prompt_embedding, result)
+    if hashing_kv is not None:
+        await hashing_kv.upsert({args_hash: {"return": result, "model": model}})
+        await hashing_kv.index_done_callback()
+    return result
+
 
+async def _openai_chat(model, prompt, system_prompt, history_messages, **kwargs) -> str:
+    openai_async_client = get_openai_async_client_instance()
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history_messages)
+    messages.append({"role": "user", "content": prompt})
     response = await openai_async_client.chat.completions.create(
         model=model, messages=messages, **kwargs
     )
-
-    if hashing_kv is not None:
-        await hashing_kv.upsert(
-            {args_hash: {"return": response.choices[0].message.content, "model": model}}
-        )
-        await hashing_kv.index_done_callback()
     return response.choices[0].message.content
 
 
@@ -80,47 +225,51 @@ async def openai_complete_if_cache(
     wait=wait_exponential(multiplier=1, min=4, max=10),
     retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
 )
-async def amazon_bedrock_complete_if_cache(
+async def openai_complete_if_cache(
     model, prompt, system_prompt=None, history_messages=[], **kwargs
 ) -> str:
-    amazon_bedrock_async_client = get_amazon_bedrock_async_client_instance()
-    hashing_kv: BaseKVStorage = kwargs.pop("hashing_kv", None)
+    return await _cached_chat(
+        _openai_chat, model, prompt, system_prompt, history_messages, **kwargs
+    )
+
+
+async def _amazon_bedrock_chat(
+    model, prompt, system_prompt, history_messages, **kwargs
+) -> str:
     messages = []
     messages.extend(history_messages)
     messages.append({"role": "user", "content": [{"text": prompt}]})
-    if hashing_kv is not None:
-        args_hash = compute_args_hash(model, messages)
-        if_cache_return = await hashing_kv.get_by_id(args_hash)
-        if if_cache_return is not None:
-            return if_cache_return["return"]
-
     inference_config = {
         "temperature": 0,
         "maxTokens": 4096 if "max_tokens" not in kwargs else kwargs["max_tokens"],
     }
 
-    async with amazon_bedrock_async_client.client(
-        "bedrock-runtime",
-        region_name=os.getenv("AWS_REGION", "us-east-1")
-    ) as bedrock_runtime:
-        if system_prompt:
-            response = await bedrock_runtime.converse(
-                modelId=model, messages=messages, inferenceConfig=inference_config,
-                system=[{"text": system_prompt}]
-            )
-        else:
-            response = await bedrock_runtime.converse(
-                modelId=model, messages=messages, inferenceConfig=inference_config,
-            )
-
-    if hashing_kv is not None:
-        await hashing_kv.upsert(
-            {args_hash: {"return": response["output"]["message"]["content"][0]["text"], "model": model}}
+    bedrock_runtime = await get_amazon_bedrock_runtime_instance()
+    if system_prompt:
+        response = await bedrock_runtime.converse(
+            modelId=model, messages=messages, inferenceConfig=inference_config,
+            system=[{"text": system_prompt}]
+        )
+    else:
+        response = await bedrock_runtime.converse(
+            modelId=model, messages=messages, inferenceConfig=inference_config,
         )
-        await hashing_kv.index_done_callback()
     return response["output"]["message"]["content"][0]["text"]
 
 
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
+)
+async def amazon_bedrock_complete_if_cache(
+    model, prompt, system_prompt=None, history_messages=[], **kwargs
+) -> str:
+    return await _cached_chat(
+        _amazon_bedrock_chat, model, prompt, system_prompt, history_messages, **kwargs
+    )
+
+
 def create_amazon_bedrock_complete_function(model_id: str) -> Callable:
     """
     Factory function to dynamically create completion functions for Amazon Bedrock
@@ -147,6 +296,7 @@ def create_amazon_bedrock_complete_function(model_id: str) -> Callable:
     
     # Set function name for easier debugging
     bedrock_complete.__name__ = f"{model_id}_complete"
+    bedrock_complete.supports_semantic_cache = True
     
     return bedrock_complete
 
@@ -182,26 +332,26 @@ async def gpt_4o_mini_complete(
     retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
 )
 async def amazon_bedrock_embedding(texts: list[str]) -> np.ndarray:
-    amazon_bedrock_async_client = get_amazon_bedrock_async_client_instance()
-
-    async with amazon_bedrock_async_client.client(
-        "bedrock-runtime",
-        region_name=os.getenv("AWS_REGION", "us-east-1")
-    ) as bedrock_runtime:
-        embeddings = []
-        for text in texts:
-            body = json.dumps(
-                {
-                    "inputText": text,
-                    "dimensions": 1024,
-                }
-            )
+    bedrock_runtime = await get_amazon_bedrock_runtime_instance()
+    # titan embeds one text per request, so fan them out instead of awaiting one by one
+    semaphore = asyncio.Semaphore(AMAZON_BEDROCK_EMBEDDING_MAX_ASYNC)
+
+    async def _embed_single_text(text: str) -> list[float]:
+        body = json.dumps(
+            {
+                "inputText": text,
+                "dimensions": 1024,
+            }
+        )
+        async with semaphore:
             response = await bedrock_runtime.invoke_model(
                 modelId="amazon.titan-embed-text-v2:0", body=body,
             )
             response_body = await response.get("body").read()
-            embeddings.append(json.loads(response_body))
-    return np.array([dp["embedding"] for dp in embeddings])
+        return json.loads(response_body)["embedding"]
+
+    embeddings = await asyncio.gather(*[_embed_single_text(text) for text in texts])
+    return np.array(embeddings, dtype=np.float32)
 
 
 @wrap_embedding_func_with_attrs(embedding_dim=1536, max_token_size=8192)
@@ -213,49 +363,44 @@ async def amazon_bedrock_embedding(texts: list[str]) -> np.ndarray:
 async def openai_embedding(texts: list[str]) -> np.ndarray:
     openai_async_client = get_openai_async_client_instance()
     response = await openai_async_client.embeddings.create(
-        model="text-embedding-3-small", input=texts, encoding_format="float"
+        model="text-embedding-3-small", input=texts, encoding_format="base64"
     )
-    return np.array([dp.embedding for dp in response.data])
+    return _decode_base64_embeddings(response.data)
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
-)
-async def azure_openai_complete_if_cache(
-    deployment_name, prompt, system_prompt=None, history_messages=[], **kwargs
+async def _azure_openai_chat(
+    deployment_name, prompt, system_prompt, history_messages, **kwargs
 ) -> str:
     azure_openai_client = get_azure_openai_async_client_instance()
-    hashing_kv: BaseKVStorage = kwargs.pop("hashing_kv", None)
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
     messages.extend(history_messages)
     messages.append({"role": "user", "content": prompt})
-    if hashing_kv is not None:
-        args_hash = compute_args_hash(deployment_name, messages)
-        if_cache_return = await hashing_kv.get_by_id(args_hash)
-        if if_cache_return is not None:
-            return if_cache_return["return"]
-
     response = await azure_openai_client.chat.completions.create(
         model=deployment_name, messages=messages, **kwargs
     )
-
-    if hashing_kv is not None:
-        await hashing_kv.upsert(
-            {
-                args_hash: {
-                    "return": response.choices[0].message.content,
-                    "model": deployment_name,
-                }
-            }
-        )
-        await hashing_kv.index_done_callback()
     return response.choices[0].message.content
 
 
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError)),
+)
+async def azure_openai_complete_if_cache(
+    deployment_name, prompt, system_prompt=None, history_messages=[], **kwargs
+) -> str:
+    return await _cached_chat(
+        _azure_openai_chat,
+        deployment_name,
+        prompt,
+        system_prompt,
+        history_messages,
+        **kwargs,
+    )
+
+
 async def azure_gpt_4o_complete(
     prompt, system_prompt=None, history_messages=[], **kwargs
 ) -> str:
@@ -280,6 +425,16 @@ async def azure_gpt_4o_mini_complete(
     )
 
 
+# these go through `_cached_chat`, GraphRAG only hands them a `semantic_cache`
+for _complete_func in (
+    gpt_4o_complete,
+    gpt_4o_mini_complete,
+    azure_gpt_4o_complete,
+    azure_gpt_4o_mini_complete,
+):
+    _complete_func.supports_semantic_cache = True
+
+
 @wrap_embedding_func_with_attrs(embedding_dim=1536, max_token_size=8192)
 @retry(
     stop=stop_after_attempt(3),
@@ -289,6 +444,6 @@ async def azure_gpt_4o_mini_complete(
 async def azure_openai_embedding(texts: list[str]) -> np.ndarray:
     azure_openai_client = get_azure_openai_async_client_instance()
     response = await azure_openai_client.embeddings.create(
-        model="text-embedding-3-small", input=texts, encoding_format="float"
+        model="text-embedding-3-small", input=texts, encoding_format="base64"
     )
-    return np.array([dp.embedding for dp in response.data])
+    return _decode_base64_embeddings(response.data)
@@ -112,9 +112,7 @@ def get_chunks(new_docs, chunk_func=chunking_by_token_size, **chunk_func_params)
     )
 
     for chunk in chunks:
-        inserting_chunks.update(
-            {compute_mdhash_id(chunk["content"], prefix="chunk-"): chunk}
-        )
+        inserting_chunks[compute_mdhash_id(chunk["content"], prefix="chunk-")] = chunk
 
     return inserting_chunks
 
@@ -307,6 +305,10 @@ async def extract_entities(
         completion_delimiter=PROMPTS["DEFAULT_COMPLETION_DELIMITER"],
         entity_types=",".join(PROMPTS["DEFAULT_ENTITY_TYPES"]),
     )
+    # only the chunk text varies, format the rest of the ~11KB template once
+    entity_extract_prefix, _, entity_extract_suffix = entity_extract_prompt.format(
+        **context_base, input_text="{input_text}"
+    ).partition("{input_text}")
     continue_prompt = PROMPTS["entiti_continue_extraction"]
     if_loop_prompt = PROMPTS["entiti_if_loop_extraction"]
 
@@ -319,7 +321,7 @@ async def extract_entities(
         chunk_key = chunk_key_dp[0]
         chunk_dp = chunk_key_dp[1]
         content = chunk_dp["content"]
-        hint_prompt = entity_extract_prompt.format(**context_base, input_text=content)
+        hint_prompt = entity_extract_prefix + content + entity_extract_suffix
         final_result = await use_llm_func(hint_prompt)
         if isinstance(final_result, list):
             final_result = final_result[0]["text"]
@@ -382,9 +384,16 @@ async def extract_entities(
         )
         return dict(maybe_nodes), dict(maybe_edges)
 
-    # use_llm_func is wrapped in ascynio.Semaphore, limiting max_async callings
+    # use_llm_func already limits the concurrent LLM calls, but without a bound every chunk
+    # would wait in its polling loop at once; created here so it binds to the running loop
+    chunk_semaphore = asyncio.Semaphore(global_config["best_model_max_async"])
+
+    async def _process_with_bound(chunk_key_dp: tuple[str, TextChunkSchema]):
+        async with chunk_semaphore:
+            return await _process_single_content(chunk_key_dp)
+
     results = await asyncio.gather(
-        *[_process_single_content(c) for c in ordered_chunks]
+        *[_process_with_bound(c) for c in ordered_chunks]
     )
     print()  # clear the progress bar
     maybe_nodes = defaultdict(list)
@@ -913,7 +922,9 @@ async def local_query(
     query_param: QueryParam,
     global_config: dict,
 ) -> str:
-    use_model_func = global_config["best_model_func"]
+    use_model_func = global_config.get(
+        "best_model_query_func", global_config["best_model_func"]
+    )
     context = await _build_local_query_context(
         query,
         knowledge_graph_inst,
@@ -944,7 +955,9 @@ async def _map_global_communities(
     global_config: dict,
 ):
     use_string_json_convert_func = global_config["convert_response_to_json_func"]
-    use_model_func = global_config["best_model_func"]
+    use_model_func = global_config.get(
+        "best_model_query_func", global_config["best_model_func"]
+    )
     community_groups = []
     while len(communities_data):
         this_group = truncate_list_by_token_size(
@@ -997,7 +1010,9 @@ async def global_query(
     }
     if not len(community_schema):
         return PROMPTS["fail_response"]
-    use_model_func = global_config["best_model_func"]
+    use_model_func = global_config.get(
+        "best_model_query_func", global_config["best_model_func"]
+    )
 
     sorted_community_schemas = sorted(
         community_schema.items(),
@@ -1077,7 +1092,9 @@ async def naive_query(
     query_param: QueryParam,
     global_config: dict,
 ):
-    use_model_func = global_config["best_model_func"]
+    use_model_func = global_config.get(
+        "best_model_query_func", global_config["best_model_func"]
+    )
     results = await chunks_vdb.query(query, top_k=query_param.top_k)
     if not len(results):
         return PROMPTS["fail_response"]
@@ -1,5 +1,6 @@
 from .gdb_networkx import NetworkXStorage
 from .gdb_neo4j import Neo4jStorage
 from .vdb_hnswlib import HNSWVectorStorage
+from .vdb_faiss import FaissVectorDBStorage
 from .vdb_nanovectordb import NanoVectorDBStorage
 from .kv_json import JsonKVStorage
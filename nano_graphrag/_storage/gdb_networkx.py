@@ -87,6 +87,8 @@ class NetworkXStorage(BaseGraphStorage):
                 f"Loaded graph from {self._graphml_xml_file} with {preloaded_graph.number_of_nodes()} nodes, {preloaded_graph.number_of_edges()} edges"
             )
         self._graph = preloaded_graph or nx.Graph()
+        # (node -> row, degree per row), built on the first batch degree query after a change
+        self._degree_index: Union[tuple[dict[str, int], np.ndarray], None] = None
         self._clustering_algorithms = {
             "leiden": self._leiden_clustering,
         }
@@ -113,8 +115,29 @@ class NetworkXStorage(BaseGraphStorage):
         # [numberchiffre]: node_id not part of graph returns `DegreeView({})` instead of 0
         return self._graph.degree(node_id) if self._graph.has_node(node_id) else 0
 
+    def _node_rows(self, node_ids: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Map node ids to rows of the degree array, missing nodes map to its trailing 0"""
+        if self._degree_index is None:
+            degrees = np.fromiter(
+                (degree for _, degree in self._graph.degree()),
+                dtype=np.int64,
+                count=self._graph.number_of_nodes(),
+            )
+            self._degree_index = (
+                {node: i for i, node in enumerate(self._graph.nodes)},
+                np.append(degrees, 0),
+            )
+        node_to_row, degrees = self._degree_index
+        rows = np.fromiter(
+            (node_to_row.get(node_id, -1) for node_id in node_ids),
+            dtype=np.int64,
+            count=len(node_ids),
+        )
+        return rows, degrees
+
     async def node_degrees_batch(self, node_ids: List[str]) -> List[str]:
-        return await asyncio.gather(*[self.node_degree(node_id) for node_id in node_ids])
+        rows, degrees = self._node_rows(node_ids)
+        return degrees[rows].tolist()
 
     async def edge_degree(self, src_id: str, tgt_id: str) -> int:
         return (self._graph.degree(src_id) if self._graph.has_node(src_id) else 0) + (
@@ -122,7 +145,10 @@ class NetworkXStorage(BaseGraphStorage):
         )
 
     async def edge_degrees_batch(self, edge_pairs: list[tuple[str, str]]) -> list[int]:
-        return await asyncio.gather(*[self.edge_degree(src_id, tgt_id) for src_id, tgt_id in edge_pairs])
+        if not edge_pairs:
+            return []
+        rows, degrees = self._node_rows([node_id for pair in edge_pairs for node_id in pair])
+        return degrees[rows].reshape(-1, 2).sum(axis=1).tolist()
 
     async def get_edge(
         self, source_node_id: str, target_node_id: str
@@ -146,6 +172,8 @@ class NetworkXStorage(BaseGraphStorage):
         in node_ids])
 
     async def upsert_node(self, node_id: str, node_data: dict[str, str]):
+        if not self._graph.has_node(node_id):
+            self._degree_index = None
         self._graph.add_node(node_id, **node_data)
 
     async def upsert_nodes_batch(self, nodes_data: list[tuple[str, dict[str, str]]]):
@@ -154,6 +182,7 @@ class NetworkXStorage(BaseGraphStorage):
     async def upsert_edge(
         self, source_node_id: str, target_node_id: str, edge_data: dict[str, str]
     ):
+        self._degree_index = None
         self._graph.add_edge(source_node_id, target_node_id, **edge_data)
 
     async def upsert_edges_batch(
@@ -227,16 +256,20 @@ class NetworkXStorage(BaseGraphStorage):
         for node_id, clusters in cluster_data.items():
             self._graph.nodes[node_id]["clusters"] = json.dumps(clusters)
 
-    async def _leiden_clustering(self):
+    def _run_hierarchical_leiden(self):
         from graspologic.partition import hierarchical_leiden
 
         graph = NetworkXStorage.stable_largest_connected_component(self._graph)
-        community_mapping = hierarchical_leiden(
+        return hierarchical_leiden(
             graph,
             max_cluster_size=self.global_config["max_graph_cluster_size"],
             random_seed=self.global_config["graph_cluster_seed"],
         )
 
+    async def _leiden_clustering(self):
+        # the leiden core is native code, keep the event loop free while it runs
+        community_mapping = await asyncio.to_thread(self._run_hierarchical_leiden)
+
         node_communities: dict[str, list[dict[str, str]]] = defaultdict(list)
         __levels = defaultdict(set)
         for partition in community_mapping:
@@ -1,6 +1,8 @@
 import os
 from dataclasses import dataclass
 
+import orjson
+
 from .._utils import load_json, logger, write_json
 from ..base import (
     BaseKVStorage,
@@ -9,17 +11,65 @@ from ..base import (
 
 @dataclass
 class JsonKVStorage(BaseKVStorage):
+    # rewrite the whole json only once the log holds as many entries as the json itself
+    # (and at least this many), so the cost of compaction is amortized over the upserts
+    wal_compaction_min_entries: int = 1000
+
     def __post_init__(self):
         working_dir = self.global_config["working_dir"]
         self._file_name = os.path.join(working_dir, f"kv_store_{self.namespace}.json")
+        self._wal_file_name = f"{self._file_name}.wal.jsonl"
         self._data = load_json(self._file_name) or {}
+        self._json_entries = len(self._data)
+        self._wal_entries = 0
+        if os.path.exists(self._file_name):
+            self._replay_wal()
+        elif os.path.exists(self._wal_file_name):
+            # the log only makes sense on top of its json, e.g. the json was removed to reset the store
+            os.remove(self._wal_file_name)
         logger.info(f"Load KV {self.namespace} with {len(self._data)} data")
 
+    def _replay_wal(self):
+        if not os.path.exists(self._wal_file_name):
+            return
+        with open(self._wal_file_name, "rb") as f:
+            for line in f:
+                try:
+                    batch = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    logger.warning(
+                        f"Skip a broken line in {self._wal_file_name}, maybe the last write was interrupted"
+                    )
+                    continue
+                self._data.update(batch)
+                self._wal_entries += len(batch)
+
+    def _append_wal(self, data: dict):
+        with open(self._wal_file_name, "ab") as f:
+            f.write(
+                orjson.dumps(
+                    data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                )
+                + b"\n"
+            )
+        self._wal_entries += len(data)
+
+    def compact(self):
+        """Write the whole store to its json and truncate the append-only log"""
+        write_json(self._data, self._file_name)
+        if os.path.exists(self._wal_file_name):
+            os.remove(self._wal_file_name)
+        self._json_entries = len(self._data)
+        self._wal_entries = 0
+
     async def all_keys(self) -> list[str]:
         return list(self._data.keys())
 
     async def index_done_callback(self):
-        write_json(self._data, self._file_name)
+        if not os.path.exists(self._file_name) or self._wal_entries >= max(
+            self.wal_compaction_min_entries, self._json_entries
+        ):
+            self.compact()
 
     async def get_by_id(self, id):
         return self._data.get(id, None)
@@ -37,10 +87,13 @@ class JsonKVStorage(BaseKVStorage):
         ]
 
     async def filter_keys(self, data: list[str]) -> set[str]:
-        return set([s for s in data if s not in self._data])
+        # the dict already is the key index, no need to keep a separate set of keys
+        return set(data).difference(self._data)
 
     async def upsert(self, data: dict[str, dict]):
         self._data.update(data)
+        self._append_wal(data)
 
     async def drop(self):
         self._data = {}
+        self.compact()
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import xxhash
+
+try:
+    import faiss
+except ImportError:  # optional, only needed by FaissVectorDBStorage
+    faiss = None
+
+from .._utils import logger
+from ..base import BaseVectorStorage
+
+
+@dataclass
+class FaissVectorDBStorage(BaseVectorStorage):
+    """Vector storage on a FAISS IVF-PQ index, for collections too large for an exact scan.
+
+    Vectors are searched exactly until `ivf_train_threshold` of them are stored, then an
+    `IVF{nlist},PQ{m}x8` index (nlist ~ sqrt(N), m ~ d/4) is trained on them and used from then on.
+    Embeddings are L2-normalized so inner products are cosine similarities.
+    """
+
+    cosine_better_than_threshold: float = 0.2
+    ivf_train_threshold: int = 4096
+    nprobe: int = 16
+    _index: Any = field(init=False)
+    _metadata: dict[int, dict] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if faiss is None:
+            raise ImportError(
+                "FaissVectorDBStorage needs faiss, install it with `pip install faiss-cpu`"
+            )
+        self._index_file_name = os.path.join(
+            self.global_config["working_dir"], f"{self.namespace}_faiss.index"
+        )
+        self._metadata_file_name = os.path.join(
+            self.global_config["working_dir"], f"{self.namespace}_faiss_metadata.pkl"
+        )
+        self._max_batch_size = self.global_config["embedding_batch_num"]
+        self.cosine_better_than_threshold = self.global_config.get(
+            "query_better_than_threshold", self.cosine_better_than_threshold
+        )
+
+        faiss_params = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        self.ivf_train_threshold = faiss_params.get(
+            "ivf_train_threshold", self.ivf_train_threshold
+        )
+        self.nprobe = faiss_params.get("nprobe", self.nprobe)
+
+        if os.path.exists(self._index_file_name) and os.path.exists(
+            self._metadata_file_name
+        ):
+            self._index = faiss.read_index(self._index_file_name)
+            with open(self._metadata_file_name, "rb") as f:
+                self._metadata = pickle.load(f)
+            logger.info(
+                f"Loaded existing index for {self.namespace} with {self._index.ntotal} elements"
+            )
+        else:
+            self._index = faiss.IndexIDMap2(
+                faiss.IndexFlatIP(self.embedding_func.embedding_dim)
+            )
+            self._metadata = {}
+
+    @property
+    def _is_trained_ivf(self) -> bool:
+        return faiss.try_extract_index_ivf(self._index) is not None
+
+    def _train_ivf(self):
+        """Move the exactly searched vectors into a freshly trained IVF-PQ index"""
+        ids = faiss.vector_to_array(self._index.id_map).astype(np.int64)
+        vectors = self._index.index.reconstruct_n(0, self._index.ntotal)
+        dim = vectors.shape[1]
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        # PQ needs m to divide d, take the largest divisor not above d / 4
+        m = next(m for m in range(max(1, dim // 4), 0, -1) if dim % m == 0)
+        index = faiss.index_factory(
+            dim, f"IVF{nlist},PQ{m}x8", faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.add_with_ids(vectors, ids)
+        self._index = index
+        logger.info(
+            f"Trained IVF{nlist},PQ{m}x8 index for {self.namespace} on {len(ids)} vectors"
+        )
+
+    async def upsert(self, data: dict[str, dict]):
+        logger.info(f"Inserting {len(data)} vectors to {self.namespace}")
+        if not len(data):
+            logger.warning("You insert an empty data to vector DB")
+            return []
+        contents = [v["content"] for v in data.values()]
+        batches = [
+            contents[i : i + self._max_batch_size]
+            for i in range(0, len(contents), self._max_batch_size)
+        ]
+        embeddings_list = await asyncio.gather(
+            *[self.embedding_func(batch) for batch in batches]
+        )
+        embeddings = np.ascontiguousarray(
+            np.concatenate(embeddings_list), dtype=np.float32
+        )
+        faiss.normalize_L2(embeddings)
+
+        # faiss ids are int64, keep the hash in the non-negative range
+        ids = np.fromiter(
+            (xxhash.xxh3_64_intdigest(k.encode()) >> 1 for k in data),
+            dtype=np.int64,
+            count=len(data),
+        )
+        for id_int, (k, v) in zip(ids.tolist(), data.items()):
+            self._metadata[id_int] = {
+                "id": k,
+                **{k1: v1 for k1, v1 in v.items() if k1 in self.meta_fields},
+            }
+        # re-inserted keys replace their old vectors
+        self._index.remove_ids(ids)
+        self._index.add_with_ids(embeddings, ids)
+        # 8-bit PQ codes need at least 256 training vectors for their centroids
+        if not self._is_trained_ivf and self._index.ntotal >= max(
+            self.ivf_train_threshold, 256
+        ):
+            self._train_ivf()
+        return ids
+
+    async def query(self, query: str, top_k=5):
+        return (await self.query_batch([query], top_k))[0]
+
+    async def query_batch(self, queries: list[str], top_k=5):
+        if self._index.ntotal == 0:
+            return [[] for _ in queries]
+        embeddings = np.ascontiguousarray(
+            await self.embedding_func(queries), dtype=np.float32
+        )
+        faiss.normalize_L2(embeddings)
+        if self._is_trained_ivf:
+            faiss.extract_index_ivf(self._index).nprobe = self.nprobe
+        similarities, ids = self._index.search(
+            embeddings, min(top_k, self._index.ntotal)
+        )
+        return [
+            [
+                {**self._metadata[id_int], "distance": float(similarity)}
+                for similarity, id_int in zip(row_similarities, row_ids.tolist())
+                # faiss pads missing results with -1
+                if id_int != -1 and similarity >= self.cosine_better_than_threshold
+            ]
+            for row_similarities, row_ids in zip(similarities, ids)
+        ]
+
+    async def index_done_callback(self):
+        faiss.write_index(self._index, self._index_file_name)
+        with open(self._metadata_file_name, "wb") as f:
+            pickle.dump(self._metadata, f)
@@ -110,8 +110,11 @@ class HNSWVectorStorage(BaseVectorStorage):
         return ids
 
     async def query(self, query: str, top_k: int = 5) -> list[dict]:
+        return (await self.query_batch([query], top_k))[0]
+
+    async def query_batch(self, queries: list[str], top_k: int = 5) -> list[list[dict]]:
         if self._current_elements == 0:
-            return []
+            return [[] for _ in queries]
 
         top_k = min(top_k, self._current_elements)
 
@@ -121,18 +124,21 @@ class HNSWVectorStorage(BaseVectorStorage):
             )
             self._index.set_ef(top_k)
 
-        embedding = await self.embedding_func([query])
+        embeddings = await self.embedding_func(queries)
         labels, distances = self._index.knn_query(
-            data=embedding[0], k=top_k, num_threads=self.num_threads
+            data=embeddings, k=top_k, num_threads=self.num_threads
         )
 
         return [
-            {
-                **self._metadata.get(label, {}),
-                "distance": distance,
-                "similarity": 1 - distance,
-            }
-            for label, distance in zip(labels[0], distances[0])
+            [
+                {
+                    **self._metadata.get(label, {}),
+                    "distance": distance,
+                    "similarity": 1 - distance,
+                }
+                for label, distance in zip(row_labels, row_distances)
+            ]
+            for row_labels, row_distances in zip(labels, distances)
         ]
 
     async def index_done_callback(self):
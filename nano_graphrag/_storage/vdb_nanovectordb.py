@@ -52,17 +52,23 @@ class NanoVectorDBStorage(BaseVectorStorage):
         return results
 
     async def query(self, query: str, top_k=5):
-        embedding = await self.embedding_func([query])
-        embedding = embedding[0]
-        results = self._client.query(
-            query=embedding,
-            top_k=top_k,
-            better_than_threshold=self.cosine_better_than_threshold,
-        )
-        results = [
-            {**dp, "id": dp["__id__"], "distance": dp["__metrics__"]} for dp in results
+        return (await self.query_batch([query], top_k))[0]
+
+    async def query_batch(self, queries: list[str], top_k=5):
+        # one embedding call for all queries, each is scanned by nano-vectordb itself,
+        # its normalized matrix is private, so the simsimd kernels of _utils can't be used here
+        embeddings = await self.embedding_func(queries)
+        return [
+            [
+                {**dp, "id": dp["__id__"], "distance": dp["__metrics__"]}
+                for dp in self._client.query(
+                    query=embedding,
+                    top_k=top_k,
+                    better_than_threshold=self.cosine_better_than_threshold,
+                )
+            ]
+            for embedding in embeddings
         ]
-        return results
 
     async def index_done_callback(self):
         self._client.save()
@@ -1,4 +1,5 @@
 import asyncio
+import base64
 import html
 import json
 import logging
@@ -7,11 +8,23 @@ import re
 import numbers
 from dataclasses import dataclass
 from functools import wraps
-from hashlib import md5
+from hashlib import blake2b, md5
 from typing import Any, Union
 
 import numpy as np
+import orjson
 import tiktoken
+import xxhash
+
+try:
+    import simsimd
+except ImportError:  # optional, fall back to numpy kernels
+    simsimd = None
+
+try:
+    import uvloop
+except ImportError:  # optional, fall back to the asyncio event loop
+    uvloop = None
 
 logger = logging.getLogger("nano-graphrag")
 logging.getLogger("neo4j").setLevel(logging.ERROR)
@@ -24,7 +37,8 @@ def always_get_an_event_loop() -> asyncio.AbstractEventLoop:
     except RuntimeError:
         # If in a sub-thread, create a new event loop.
         logger.info("Creating a new event loop in a sub-thread.")
-        loop = asyncio.new_event_loop()
+        # run the sync wrappers on uvloop if installed
+        loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
     return loop
 
@@ -146,20 +160,33 @@ def truncate_list_by_token_size(list_data: list, key: callable, max_token_size:
     return list_data
 
 
-def compute_mdhash_id(content, prefix: str = ""):
-    return prefix + md5(content.encode()).hexdigest()
+def compute_mdhash_id(content, prefix: str = "", hash: str = "md5"):
+    """`hash="blake2b"` (16-byte digest) is faster than the default md5, but yields different ids for existing data"""
+    if hash == "md5":
+        return prefix + md5(content.encode()).hexdigest()
+    if hash == "blake2b":
+        return prefix + blake2b(content.encode(), digest_size=16).hexdigest()
+    raise ValueError(f"Unknown hash {hash}")
 
 
 def write_json(json_obj, file_name):
-    with open(file_name, "w", encoding="utf-8") as f:
-        json.dump(json_obj, f, indent=2, ensure_ascii=False)
+    # orjson emits utf-8 bytes directly and never escapes non-ascii, same layout as json.dump(indent=2)
+    with open(file_name, "wb") as f:
+        f.write(
+            orjson.dumps(
+                json_obj,
+                option=orjson.OPT_INDENT_2
+                | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_SERIALIZE_NUMPY,
+            )
+        )
 
 
 def load_json(file_name):
     if not os.path.exists(file_name):
         return None
-    with open(file_name, encoding="utf-8") as f:
-        return json.load(f)
+    with open(file_name, "rb") as f:
+        return orjson.loads(f.read())
 
 
 # it's dirty to type, so it's a good way to have fun
@@ -181,7 +208,43 @@ def is_float_regex(value):
 
 
 def compute_args_hash(*args):
-    return md5(str(args).encode()).hexdigest()
+    """Hash the arguments of a LLM call as the key of the response cache; this runs on every call, even cache hits"""
+    return xxhash.xxh3_128_hexdigest(orjson.dumps(args, default=str))
+
+
+def cosine_similarity(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity between a query vector and each row of matrix, using the SIMD kernels of simsimd if installed"""
+    if not len(matrix):
+        return np.empty(0, dtype=np.float32)
+    if simsimd is not None and query.dtype == matrix.dtype:
+        distances = simsimd.cdist(
+            np.ascontiguousarray(query).reshape(1, -1),
+            np.ascontiguousarray(matrix),
+            metric="cosine",
+        )
+        return 1 - np.asarray(distances, dtype=np.float32)[0]
+    query = query.astype(np.float32, copy=False)
+    matrix = matrix.astype(np.float32, copy=False)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return np.divide(
+        matrix @ query, norms, out=np.zeros(len(matrix), dtype=np.float32), where=norms > 0
+    )
+
+
+def quantize_int8(embeddings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization, return the int8 codes and the float32 scale of each row.
+
+    4x smaller than float32 and within ~1% recall for cosine search. Cosine is scale invariant,
+    so similarities can be computed on the codes directly, scales are only needed to dequantize.
+    """
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    codes = np.round(embeddings / np.where(scales > 0, scales, 1.0)[:, None])
+    return codes.astype(np.int8), scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
 
 
 def split_string_by_multi_markers(content: str, markers: list[str]) -> list[str]:
@@ -258,6 +321,139 @@ def limit_async_func_call(max_size: int, waitting_time: float = 0.0001):
     return final_decro
 
 
+def coalesce_async_func_call(max_batch_size: int = 256, max_wait_time: float = 0.005):
+    """Merge concurrent calls of a batch func (list in, array out) into fewer, larger calls.
+
+    A call waits at most `max_wait_time` seconds for others to join, a batch is flushed
+    as soon as it holds `max_batch_size` items. Each caller gets back its own slice.
+    """
+
+    def final_decro(func):
+        pending = []
+        pending_size = 0
+        flush_task = None
+
+        async def run_batch(batch):
+            try:
+                results = await func([item for items, _ in batch for item in items])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            start = 0
+            for items, future in batch:
+                if not future.done():
+                    future.set_result(results[start : start + len(items)])
+                start += len(items)
+
+        async def flush_later():
+            nonlocal pending, pending_size, flush_task
+            await asyncio.sleep(max_wait_time)
+            batch, pending, pending_size, flush_task = pending, [], 0, None
+            await run_batch(batch)
+
+        @wraps(func)
+        async def wait_func(items):
+            nonlocal pending, pending_size, flush_task
+            if not items:
+                return await func(items)
+            future = asyncio.get_running_loop().create_future()
+            pending.append((items, future))
+            pending_size += len(items)
+            if pending_size >= max_batch_size:
+                if flush_task is not None:
+                    flush_task.cancel()
+                batch, pending, pending_size, flush_task = pending, [], 0, None
+                await run_batch(batch)
+            elif flush_task is None:
+                flush_task = asyncio.create_task(flush_later())
+            return await future
+
+        return wait_func
+
+    return final_decro
+
+
+def cached_embedding(
+    hashing_kv,
+    embedding_func,
+    quantize: Union[str, None] = None,
+    cache_key: Union[str, None] = None,
+):
+    """Serve texts already embedded by `embedding_func` from the `hashing_kv` storage, only the misses are embedded.
+
+    Entries are keyed by `cache_key` (the function name by default), the embedding dimension and the text.
+    Pass a model identifier as `cache_key` if the model behind a function can change,
+    otherwise a same-named function of the same dimension reuses the old model's vectors.
+    Set quantize="float16" (half the size, lossless for cosine ranking) or "int8" (a quarter,
+    ~1% recall loss) to shrink the stored vectors, cached embeddings are always returned as float32.
+    """
+    if quantize not in (None, "float16", "int8"):
+        raise ValueError(f"Unsupported quantization {quantize}")
+    func_name = cache_key or getattr(
+        getattr(embedding_func, "func", embedding_func), "__name__", ""
+    )
+    embedding_dim = embedding_func.embedding_dim
+
+    @wraps(embedding_func)
+    async def cached_func(texts: list[str]) -> np.ndarray:
+        if not texts:
+            return await embedding_func(texts)
+        # the same text under another cache key or at another dimension is a different entry
+        keys = [compute_args_hash(func_name, embedding_dim, text) for text in texts]
+        cached = await hashing_kv.get_by_ids(keys)
+        miss_texts = {}
+        for key, text, hit in zip(keys, texts, cached):
+            if hit is None:
+                miss_texts.setdefault(key, text)
+        new_embeddings = {}
+        if miss_texts:
+            embeddings = await embedding_func(list(miss_texts.values()))
+            new_embeddings = dict(zip(miss_texts, np.asarray(embeddings, dtype=np.float32)))
+            await hashing_kv.upsert(
+                {
+                    key: _pack_embedding(embedding, quantize)
+                    for key, embedding in new_embeddings.items()
+                }
+            )
+        return np.stack(
+            [
+                new_embeddings[key] if hit is None else _unpack_embedding(hit)
+                for key, hit in zip(keys, cached)
+            ]
+        )
+
+    return cached_func
+
+
+def _pack_embedding(embedding: np.ndarray, quantize: Union[str, None] = None) -> dict:
+    if quantize == "int8":
+        codes, scales = quantize_int8(embedding)
+        return {
+            "embedding": base64.b64encode(codes.tobytes()).decode(),
+            "dtype": "int8",
+            "scale": float(scales[0]),
+        }
+    dtype = "<f2" if quantize == "float16" else "<f4"
+    return {
+        "embedding": base64.b64encode(embedding.astype(dtype).tobytes()).decode(),
+        "dtype": quantize or "float32",
+    }
+
+
+def _unpack_embedding(packed: dict) -> np.ndarray:
+    buffer = base64.b64decode(packed["embedding"])
+    # entries written before quantization was supported carry no dtype
+    dtype = packed.get("dtype", "float32")
+    if dtype == "int8":
+        codes = np.frombuffer(buffer, dtype=np.int8)
+        return codes.astype(np.float32) * np.float32(packed["scale"])
+    if dtype == "float16":
+        return np.frombuffer(buffer, dtype="<f2").astype(np.float32)
+    return np.frombuffer(buffer, dtype="<f4")
+
+
 def wrap_embedding_func_with_attrs(**kwargs):
     """Wrap a function with attributes"""
 
@@ -1,3 +1,4 @@
+import asyncio
 from dataclasses import dataclass, field
 from typing import TypedDict, Union, Literal, Generic, TypeVar, List
 
@@ -14,7 +15,7 @@ class QueryParam:
     level: int = 2
     top_k: int = 20
     # naive search
-    naive_max_token_for_text_unit = 12000
+    naive_max_token_for_text_unit: int = 12000
     # local search
     local_max_token_for_text_unit: int = 4000  # 12000 * 0.33
     local_max_token_for_local_context: int = 4800  # 12000 * 0.4
@@ -82,6 +83,10 @@ class BaseVectorStorage(StorageNameSpace):
     async def query(self, query: str, top_k: int) -> list[dict]:
         raise NotImplementedError
 
+    async def query_batch(self, queries: list[str], top_k: int) -> list[list[dict]]:
+        """Results of `query` for each of the queries, backends can override it with one batched search"""
+        return await asyncio.gather(*[self.query(query, top_k) for query in queries])
+
     async def upsert(self, data: dict[str, dict]):
         """Use 'content' field from value for embedding, use key as id.
         If embedding_func is None, use 'embedding' field from value
@@ -1,6 +1,7 @@
 import asyncio
+import logging
 import os
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime
 from functools import partial
 from typing import Callable, Dict, List, Optional, Type, Union, cast
@@ -9,6 +10,7 @@ import tiktoken
 
 
 from ._llm import (
+    SemanticCache,
     amazon_bedrock_embedding,
     create_amazon_bedrock_complete_function,
     gpt_4o_complete,
@@ -17,6 +19,7 @@ from ._llm import (
     azure_gpt_4o_complete,
     azure_openai_embedding,
     azure_gpt_4o_mini_complete,
+    close_amazon_bedrock_runtime,
 )
 from ._op import (
     chunking_by_token_size,
@@ -34,6 +37,7 @@ from ._storage import (
 )
 from ._utils import (
     EmbeddingFunc,
+    cached_embedding,
     compute_mdhash_id,
     limit_async_func_call,
     convert_response_to_json,
@@ -89,7 +93,6 @@ class GraphRAG:
             "dimensions": 1536,
             "num_walks": 10,
             "walk_length": 40,
-            "num_walks": 10,
             "window_size": 2,
             "iterations": 3,
             "random_seed": 3,
@@ -128,6 +131,13 @@ class GraphRAG:
     vector_db_storage_cls_kwargs: dict = field(default_factory=dict)
     graph_storage_cls: Type[BaseGraphStorage] = NetworkXStorage
     enable_llm_cache: bool = True
+    # reuse the response of a near-duplicate prompt, only the built-in model funcs consult it
+    enable_semantic_llm_cache: bool = False
+    semantic_llm_cache_threshold: float = 0.97
+    enable_embedding_cache: bool = False
+    embedding_cache_quantize: Optional[str] = None
+    # identifies the embedding model in the cache, defaults to the embedding function's name
+    embedding_cache_key: Optional[str] = None
 
     # extension
     always_create_working_dir: bool = True
@@ -135,8 +145,9 @@ class GraphRAG:
     convert_response_to_json_func: callable = convert_response_to_json
 
     def __post_init__(self):
-        _print_config = ",\n  ".join([f"{k} = {v}" for k, v in asdict(self).items()])
-        logger.debug(f"GraphRAG init with param:\n\n  {_print_config}\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            _print_config = ",\n  ".join([f"{k} = {v}" for k, v in asdict(self).items()])
+            logger.debug(f"GraphRAG init with param:\n\n  {_print_config}\n")
 
         if self.using_azure_openai:
             # If there's no OpenAI API key, use Azure OpenAI
@@ -162,36 +173,54 @@ class GraphRAG:
             logger.info(f"Creating working directory {self.working_dir}")
             os.makedirs(self.working_dir)
 
+        # build the config once, shallow so in-place edits of dict fields (addon_params, ...) are seen,
+        # fields reassigned after __post_init__ are not
+        self._config = {f.name: getattr(self, f.name) for f in fields(self)}
+
         self.full_docs = self.key_string_value_json_storage_cls(
-            namespace="full_docs", global_config=asdict(self)
+            namespace="full_docs", global_config=self._config
         )
 
         self.text_chunks = self.key_string_value_json_storage_cls(
-            namespace="text_chunks", global_config=asdict(self)
+            namespace="text_chunks", global_config=self._config
         )
 
         self.llm_response_cache = (
             self.key_string_value_json_storage_cls(
-                namespace="llm_response_cache", global_config=asdict(self)
+                namespace="llm_response_cache", global_config=self._config
             )
             if self.enable_llm_cache
             else None
         )
 
         self.community_reports = self.key_string_value_json_storage_cls(
-            namespace="community_reports", global_config=asdict(self)
+            namespace="community_reports", global_config=self._config
         )
         self.chunk_entity_relation_graph = self.graph_storage_cls(
-            namespace="chunk_entity_relation", global_config=asdict(self)
+            namespace="chunk_entity_relation", global_config=self._config
         )
 
         self.embedding_func = limit_async_func_call(self.embedding_func_max_async)(
             self.embedding_func
         )
+        self.embedding_cache = (
+            self.key_string_value_json_storage_cls(
+                namespace="embedding_cache", global_config=self._config
+            )
+            if self.enable_embedding_cache
+            else None
+        )
+        if self.embedding_cache is not None:
+            self.embedding_func = cached_embedding(
+                self.embedding_cache,
+                self.embedding_func,
+                quantize=self.embedding_cache_quantize,
+                cache_key=self.embedding_cache_key,
+            )
         self.entities_vdb = (
             self.vector_db_storage_cls(
                 namespace="entities",
-                global_config=asdict(self),
+                global_config=self._config,
                 embedding_func=self.embedding_func,
                 meta_fields={"entity_name"},
             )
@@ -201,27 +230,64 @@ class GraphRAG:
         self.chunks_vdb = (
             self.vector_db_storage_cls(
                 namespace="chunks",
-                global_config=asdict(self),
+                global_config=self._config,
                 embedding_func=self.embedding_func,
             )
             if self.enable_naive_rag
             else None
         )
 
+        # only the built-in model funcs know the `semantic_cache` kwarg
+        if self.enable_semantic_llm_cache and not getattr(
+            self.best_model_func, "supports_semantic_cache", False
+        ):
+            logger.warning(
+                "enable_semantic_llm_cache only works with the built-in best_model_func, ignored"
+            )
+        self.semantic_llm_cache = (
+            SemanticCache(
+                embedding_func=self.embedding_func,
+                similarity_threshold=self.semantic_llm_cache_threshold,
+            )
+            if self.enable_semantic_llm_cache
+            and getattr(self.best_model_func, "supports_semantic_cache", False)
+            else None
+        )
+
         self.best_model_func = limit_async_func_call(self.best_model_max_async)(
             partial(self.best_model_func, hashing_kv=self.llm_response_cache)
         )
         self.cheap_model_func = limit_async_func_call(self.cheap_model_max_async)(
             partial(self.cheap_model_func, hashing_kv=self.llm_response_cache)
         )
+        # the semantic cache embeds the prompt, that is only the user query in the answer calls,
+        # extraction/summary/report prompts share a long template and would all look alike
+        self.best_model_query_func = (
+            partial(self.best_model_func, semantic_cache=self.semantic_llm_cache)
+            if self.semantic_llm_cache is not None
+            else self.best_model_func
+        )
+        # the wrapped funcs replaced the fields above, hand them to _op too
+        self._config.update(
+            embedding_func=self.embedding_func,
+            best_model_func=self.best_model_func,
+            cheap_model_func=self.cheap_model_func,
+            best_model_query_func=self.best_model_query_func,
+        )
 
     def insert(self, string_or_strings):
         loop = always_get_an_event_loop()
-        return loop.run_until_complete(self.ainsert(string_or_strings))
+        try:
+            return loop.run_until_complete(self.ainsert(string_or_strings))
+        finally:
+            loop.run_until_complete(close_amazon_bedrock_runtime())
 
     def query(self, query: str, param: QueryParam = QueryParam()):
         loop = always_get_an_event_loop()
-        return loop.run_until_complete(self.aquery(query, param))
+        try:
+            return loop.run_until_complete(self.aquery(query, param))
+        finally:
+            loop.run_until_complete(close_amazon_bedrock_runtime())
 
     async def aquery(self, query: str, param: QueryParam = QueryParam()):
         if param.mode == "local" and not self.enable_local:
@@ -236,7 +302,7 @@ class GraphRAG:
                 self.community_reports,
                 self.text_chunks,
                 param,
-                asdict(self),
+                self._config,
             )
         elif param.mode == "global":
             response = await global_query(
@@ -246,7 +312,7 @@ class GraphRAG:
                 self.community_reports,
                 self.text_chunks,
                 param,
-                asdict(self),
+                self._config,
             )
         elif param.mode == "naive":
             response = await naive_query(
@@ -254,7 +320,7 @@ class GraphRAG:
                 self.chunks_vdb,
                 self.text_chunks,
                 param,
-                asdict(self),
+                self._config,
             )
         else:
             raise ValueError(f"Unknown mode {param.mode}")
@@ -267,51 +333,59 @@ class GraphRAG:
             if isinstance(string_or_strings, str):
                 string_or_strings = [string_or_strings]
             # ---------- new docs
+            stripped_docs = [c.strip() for c in string_or_strings]
             new_docs = {
-                compute_mdhash_id(c.strip(), prefix="doc-"): {"content": c.strip()}
-                for c in string_or_strings
+                compute_mdhash_id(c, prefix="doc-"): {"content": c}
+                for c in stripped_docs
             }
-            _add_doc_keys = await self.full_docs.filter_keys(list(new_docs.keys()))
-            new_docs = {k: v for k, v in new_docs.items() if k in _add_doc_keys}
-            if not len(new_docs):
+            doc_keys = list(new_docs)
+            _add_doc_keys = await self.full_docs.filter_keys(doc_keys)
+            if not len(_add_doc_keys):
                 logger.warning(f"All docs are already in the storage")
                 return
+            # keep the insertion order, the set of new keys is unordered
+            if len(_add_doc_keys) < len(doc_keys):
+                new_docs = {k: new_docs[k] for k in doc_keys if k in _add_doc_keys}
             logger.info(f"[New Docs] inserting {len(new_docs)} docs")
 
             # ---------- chunking
 
-            inserting_chunks = get_chunks(
+            # tokenizing is CPU bound, keep it off the event loop
+            inserting_chunks = await asyncio.to_thread(
+                get_chunks,
                 new_docs=new_docs,
                 chunk_func=self.chunk_func,
                 overlap_token_size=self.chunk_overlap_token_size,
                 max_token_size=self.chunk_token_size,
             )
 
-            _add_chunk_keys = await self.text_chunks.filter_keys(
-                list(inserting_chunks.keys())
-            )
-            inserting_chunks = {
-                k: v for k, v in inserting_chunks.items() if k in _add_chunk_keys
-            }
-            if not len(inserting_chunks):
+            chunk_keys = list(inserting_chunks)
+            _add_chunk_keys = await self.text_chunks.filter_keys(chunk_keys)
+            if not len(_add_chunk_keys):
                 logger.warning(f"All chunks are already in the storage")
                 return
+            if len(_add_chunk_keys) < len(chunk_keys):
+                inserting_chunks = {
+                    k: inserting_chunks[k] for k in chunk_keys if k in _add_chunk_keys
+                }
             logger.info(f"[New Chunks] inserting {len(inserting_chunks)} chunks")
             if self.enable_naive_rag:
                 logger.info("Insert chunks for naive RAG")
                 await self.chunks_vdb.upsert(inserting_chunks)
 
-            # TODO: no incremental update for communities now, so just drop all
-            await self.community_reports.drop()
-
             # ---------- extract/summary entity and upsert to graph
             logger.info("[Entity Extraction]...")
-            maybe_new_kg = await self.entity_extraction_func(
-                inserting_chunks,
-                knwoledge_graph_inst=self.chunk_entity_relation_graph,
-                entity_vdb=self.entities_vdb,
-                global_config=asdict(self),
-                using_amazon_bedrock=self.using_amazon_bedrock,
+            # TODO: no incremental update for communities now, so just drop all
+            # the reports are only rebuilt after clustering, so the drop can overlap the extraction
+            _, maybe_new_kg = await asyncio.gather(
+                self.community_reports.drop(),
+                self.entity_extraction_func(
+                    inserting_chunks,
+                    knwoledge_graph_inst=self.chunk_entity_relation_graph,
+                    entity_vdb=self.entities_vdb,
+                    global_config=self._config,
+                    using_amazon_bedrock=self.using_amazon_bedrock,
+                ),
             )
             if maybe_new_kg is None:
                 logger.warning("No new entities found")
@@ -323,7 +397,7 @@ class GraphRAG:
                 self.graph_cluster_algorithm
             )
             await generate_community_report(
-                self.community_reports, self.chunk_entity_relation_graph, asdict(self)
+                self.community_reports, self.chunk_entity_relation_graph, self._config
             )
 
             # ---------- commit upsertings and indexing
@@ -348,6 +422,7 @@ class GraphRAG:
             self.full_docs,
             self.text_chunks,
             self.llm_response_cache,
+            self.embedding_cache,
             self.community_reports,
             self.entities_vdb,
             self.chunks_vdb,
@@ -360,7 +435,7 @@ class GraphRAG:
 
     async def _query_done(self):
         tasks = []
-        for storage_inst in [self.llm_response_cache]:
+        for storage_inst in [self.llm_response_cache, self.embedding_cache]:
             if storage_inst is None:
                 continue
             tasks.append(cast(StorageNameSpace, storage_inst).index_done_callback())
@@ -0,0 +1,98 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from dataclasses import asdict
+from nano_graphrag import GraphRAG
+from nano_graphrag._utils import wrap_embedding_func_with_attrs
+from nano_graphrag._storage import FaissVectorDBStorage
+
+faiss = pytest.importorskip("faiss")
+
+WORKING_DIR = "./tests/nano_graphrag_cache_faiss_vector_storage_test"
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    if os.path.exists(WORKING_DIR):
+        shutil.rmtree(WORKING_DIR)
+    os.mkdir(WORKING_DIR)
+
+    yield
+
+    shutil.rmtree(WORKING_DIR)
+
+
+@wrap_embedding_func_with_attrs(embedding_dim=64, max_token_size=8192)
+async def mock_embedding(texts: list[str]) -> np.ndarray:
+    # deterministic per text, so a query for a stored content finds it back
+    return np.stack(
+        [
+            np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(64)
+            for text in texts
+        ]
+    )
+
+
+def make_storage(namespace="test", **kwargs):
+    rag = GraphRAG(working_dir=WORKING_DIR, embedding_func=mock_embedding)
+    return FaissVectorDBStorage(
+        namespace=namespace,
+        global_config=asdict(rag),
+        embedding_func=mock_embedding,
+        meta_fields={"entity_name"},
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_upsert_and_query(setup_teardown):
+    storage = make_storage()
+    assert await storage.query("Test content 1", top_k=2) == []
+
+    await storage.upsert(
+        {
+            "1": {"content": "Test content 1", "entity_name": "Entity 1"},
+            "2": {"content": "Test content 2", "entity_name": "Entity 2"},
+        }
+    )
+    await storage.upsert(
+        {"1": {"content": "Updated content 1", "entity_name": "Updated Entity 1"}}
+    )
+
+    results = await storage.query("Updated content 1", top_k=2)
+    assert results[0]["id"] == "1"
+    assert results[0]["entity_name"] == "Updated Entity 1"
+    assert results[0]["distance"] == pytest.approx(1.0, abs=1e-4)
+    assert storage._index.ntotal == 2
+
+
+@pytest.mark.asyncio
+async def test_ivf_training_and_persistence(setup_teardown):
+    storage = make_storage(namespace="test_large")
+    storage.ivf_train_threshold = 1000
+    large_data = {
+        str(i): {"content": f"Test content {i}", "entity_name": f"Entity {i}"}
+        for i in range(1000)
+    }
+    await storage.upsert(large_data)
+    assert faiss.try_extract_index_ivf(storage._index) is not None
+    await storage.index_done_callback()
+
+    new_storage = make_storage(namespace="test_large")
+    assert new_storage._index.ntotal == 1000
+    results = await new_storage.query("Test content 42", top_k=5)
+    assert results[0]["id"] == "42"
+
+
+@pytest.mark.asyncio
+async def test_query_batch(setup_teardown):
+    storage = make_storage()
+    test_data = {
+        str(i): {"content": f"Test content {i}", "entity_name": f"Entity {i}"}
+        for i in range(5)
+    }
+    await storage.upsert(test_data)
+
+    results = await storage.query_batch(["Test content 3", "Test content 1"], top_k=2)
+    assert [result[0]["id"] for result in results] == ["3", "1"]
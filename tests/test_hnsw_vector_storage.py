@@ -285,3 +285,19 @@ async def test_ef_search_values(setup_teardown):
     storage._index.set_ef(20)
     results_higher_ef = await storage.query("Test query", top_k=15)
     assert len(results_higher_ef) == 15
+
+
+@pytest.mark.asyncio
+async def test_query_batch(hnsw_storage):
+    assert await hnsw_storage.query_batch(["Test query 1", "Test query 2"], top_k=2) == [[], []]
+
+    test_data = {
+        str(i): {"content": f"Test content {i}", "entity_name": f"Entity {i}"}
+        for i in range(5)
+    }
+    await hnsw_storage.upsert(test_data)
+
+    results = await hnsw_storage.query_batch(["Test query 1", "Test query 2"], top_k=3)
+    assert len(results) == 2
+    assert all(len(result) == 3 for result in results)
+    assert all(dp["id"] in test_data for result in results for dp in result)
@@ -0,0 +1,75 @@
+import os
+import shutil
+import pytest
+from nano_graphrag._storage import JsonKVStorage
+
+WORKING_DIR = "./tests/nano_graphrag_cache_json_kv_storage_test"
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    if os.path.exists(WORKING_DIR):
+        shutil.rmtree(WORKING_DIR)
+    os.mkdir(WORKING_DIR)
+
+    yield
+
+    shutil.rmtree(WORKING_DIR)
+
+
+def make_storage(**kwargs):
+    return JsonKVStorage(
+        namespace="test", global_config={"working_dir": WORKING_DIR}, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_upsert_is_persisted_without_compaction(setup_teardown):
+    storage = make_storage()
+    await storage.upsert({"a": {"content": "1"}})
+    await storage.index_done_callback()  # first callback writes the json
+    await storage.upsert({"b": {"content": "2"}, "a": {"content": "3"}})
+    await storage.index_done_callback()  # small log, only appended
+
+    assert os.path.exists(storage._wal_file_name)
+    reloaded = make_storage()
+    assert await reloaded.get_by_ids(["a", "b"]) == [{"content": "3"}, {"content": "2"}]
+
+
+@pytest.mark.asyncio
+async def test_compaction_truncates_log(setup_teardown):
+    storage = make_storage(wal_compaction_min_entries=2)
+    await storage.upsert({"a": {"content": "1"}})
+    await storage.index_done_callback()
+    await storage.upsert({"b": {"content": "2"}, "c": {"content": "3"}})
+    await storage.index_done_callback()
+
+    assert not os.path.exists(storage._wal_file_name)
+    assert len(await make_storage().all_keys()) == 3
+
+
+@pytest.mark.asyncio
+async def test_drop_and_removed_json(setup_teardown):
+    storage = make_storage()
+    await storage.upsert({"a": {"content": "1"}})
+    await storage.index_done_callback()
+    await storage.upsert({"b": {"content": "2"}})
+    await storage.drop()
+    assert await make_storage().all_keys() == []
+
+    await storage.upsert({"c": {"content": "3"}})
+    os.remove(storage._file_name)
+    # the log is discarded together with its json
+    assert await make_storage().all_keys() == []
+
+
+@pytest.mark.asyncio
+async def test_broken_log_line_is_skipped(setup_teardown):
+    storage = make_storage()
+    await storage.upsert({"a": {"content": "1"}})
+    await storage.index_done_callback()
+    await storage.upsert({"b": {"content": "2"}})
+    with open(storage._wal_file_name, "ab") as f:
+        f.write(b'{"c": {"cont')
+
+    assert sorted(await make_storage().all_keys()) == ["a", "b"]
@@ -0,0 +1,72 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from dataclasses import asdict
+from nano_graphrag import GraphRAG
+from nano_graphrag._utils import wrap_embedding_func_with_attrs
+from nano_graphrag._storage import NanoVectorDBStorage
+
+WORKING_DIR = "./tests/nano_graphrag_cache_nano_vectordb_storage_test"
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    if os.path.exists(WORKING_DIR):
+        shutil.rmtree(WORKING_DIR)
+    os.mkdir(WORKING_DIR)
+
+    yield
+
+    shutil.rmtree(WORKING_DIR)
+
+
+@wrap_embedding_func_with_attrs(embedding_dim=32, max_token_size=8192)
+async def mock_embedding(texts: list[str]) -> np.ndarray:
+    return np.random.rand(len(texts), 32).astype(np.float32)
+
+
+@pytest.mark.asyncio
+async def test_query_batch_matches_query(setup_teardown):
+    rag = GraphRAG(working_dir=WORKING_DIR, embedding_func=mock_embedding)
+    storage = NanoVectorDBStorage(
+        namespace="test",
+        global_config=asdict(rag),
+        embedding_func=mock_embedding,
+        meta_fields={"entity_name"},
+    )
+    await storage.upsert(
+        {
+            str(i): {"content": f"Test content {i}", "entity_name": f"Entity {i}"}
+            for i in range(50)
+        }
+    )
+
+    queries = np.random.rand(2, 32).astype(np.float32)
+
+    async def fixed_embedding(texts):
+        return queries[: len(texts)]
+
+    storage.embedding_func = fixed_embedding
+    batch = await storage.query_batch(["Test query 1", "Test query 2"], top_k=10)
+    expected = [
+        storage._client.query(
+            query=query,
+            top_k=10,
+            better_than_threshold=storage.cosine_better_than_threshold,
+        )
+        for query in queries
+    ]
+    for results, expected_results in zip(batch, expected):
+        assert [dp["id"] for dp in results] == [dp["__id__"] for dp in expected_results]
+        assert np.allclose(
+            [dp["distance"] for dp in results],
+            [dp["__metrics__"] for dp in expected_results],
+            atol=1e-4,
+        )
+        assert all("entity_name" in dp for dp in results)
+    single = await storage.query("Test query 1", top_k=3)
+    assert [dp["id"] for dp in single] == [dp["id"] for dp in batch[0][:3]]
+    assert np.allclose(
+        [dp["distance"] for dp in single], [dp["distance"] for dp in batch[0][:3]], atol=1e-4
+    )
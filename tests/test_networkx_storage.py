@@ -375,3 +375,18 @@ async def test_error_handling(networkx_storage):
 
     with pytest.raises(ValueError, match="Node embedding algorithm invalid_algo not supported"):
         await networkx_storage.embed_nodes("invalid_algo")
+
+
+@pytest.mark.asyncio
+async def test_degrees_batch(networkx_storage):
+    await networkx_storage.upsert_edges_batch(
+        [("A", "B", {"weight": 1.0}), ("A", "C", {"weight": 1.0})]
+    )
+    assert await networkx_storage.node_degrees_batch(["A", "B", "missing"]) == [2, 1, 0]
+    assert await networkx_storage.edge_degrees_batch([("A", "B"), ("B", "missing")]) == [3, 1]
+
+    # the cached degrees follow later upserts
+    await networkx_storage.upsert_edge("B", "C", {"weight": 1.0})
+    await networkx_storage.upsert_node("D", {})
+    assert await networkx_storage.node_degrees_batch(["B", "D"]) == [2, 0]
+    assert await networkx_storage.edge_degrees_batch([]) == []
@@ -1,7 +1,11 @@
+import asyncio
+import base64
 import pytest
 import numpy as np
 from unittest.mock import AsyncMock, Mock, patch
 from nano_graphrag import _llm
+from nano_graphrag._storage import JsonKVStorage
+from nano_graphrag._utils import wrap_embedding_func_with_attrs
 
 
 def test_get_openai_async_client_instance():
@@ -103,30 +107,148 @@ async def test_azure_openai_gpt4omini(mock_azure_openai_client):
 @pytest.mark.asyncio
 async def test_openai_embedding(mock_openai_client):
     mock_response = AsyncMock()
-    mock_response.data = [Mock(embedding=[1, 1, 1])]
+    mock_response.data = [
+        Mock(embedding=base64.b64encode(np.ones(3, dtype=np.float32).tobytes()))
+    ]
     texts = ["Hello world"]
     mock_openai_client.embeddings.create.return_value = mock_response
 
     response = await _llm.openai_embedding(texts)
 
     mock_openai_client.embeddings.create.assert_awaited_once_with(
-        model="text-embedding-3-small", input=texts, encoding_format="float"
+        model="text-embedding-3-small", input=texts, encoding_format="base64"
     )
     # print(response)
+    assert response.dtype == np.float32
     assert np.allclose(response, np.array([[1, 1, 1]]))
 
 
 @pytest.mark.asyncio
 async def test_azure_openai_embedding(mock_azure_openai_client):
     mock_response = AsyncMock()
-    mock_response.data = [Mock(embedding=[1, 1, 1])]
+    mock_response.data = [
+        Mock(embedding=base64.b64encode(np.ones(3, dtype=np.float32).tobytes()))
+    ]
     texts = ["Hello world"]
     mock_azure_openai_client.embeddings.create.return_value = mock_response
 
     response = await _llm.azure_openai_embedding(texts)
 
     mock_azure_openai_client.embeddings.create.assert_awaited_once_with(
-        model="text-embedding-3-small", input=texts, encoding_format="float"
+        model="text-embedding-3-small", input=texts, encoding_format="base64"
     )
     # print(response)
+    assert response.dtype == np.float32
     assert np.allclose(response, np.array([[1, 1, 1]]))
+
+
+@wrap_embedding_func_with_attrs(embedding_dim=2, max_token_size=8192)
+async def mock_prompt_embedding(texts: list[str]) -> np.ndarray:
+    # prompts starting with the same word are "semantically" identical
+    return np.array(
+        [[1.0, 0.0] if t.split()[0] == "hello" else [0.0, 1.0] for t in texts]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("quantize", [None, "int8"])
+async def test_openai_semantic_cache_hit(mock_openai_client, quantize):
+    mock_response = AsyncMock()
+    mock_response.choices = [Mock(message=Mock(content="1"))]
+    mock_openai_client.chat.completions.create.return_value = mock_response
+    semantic_cache = _llm.SemanticCache(
+        embedding_func=mock_prompt_embedding, quantize=quantize
+    )
+
+    first = await _llm.gpt_4o_complete("hello world", semantic_cache=semantic_cache)
+    second = await _llm.gpt_4o_complete("hello  world!", semantic_cache=semantic_cache)
+
+    assert first == second == "1"
+    mock_openai_client.chat.completions.create.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_openai_semantic_cache_hit_not_stored_exactly(mock_openai_client, tmp_path):
+    mock_response = AsyncMock()
+    mock_response.choices = [Mock(message=Mock(content="1"))]
+    mock_openai_client.chat.completions.create.return_value = mock_response
+    semantic_cache = _llm.SemanticCache(embedding_func=mock_prompt_embedding)
+    hashing_kv = JsonKVStorage(
+        namespace="llm_response_cache", global_config={"working_dir": str(tmp_path)}
+    )
+
+    await _llm.gpt_4o_complete(
+        "hello world", hashing_kv=hashing_kv, semantic_cache=semantic_cache
+    )
+    await _llm.gpt_4o_complete(
+        "hello  world!", hashing_kv=hashing_kv, semantic_cache=semantic_cache
+    )
+
+    mock_openai_client.chat.completions.create.assert_awaited_once()
+    # only the answer the LLM actually gave is an exact cache entry
+    assert len(await hashing_kv.all_keys()) == 1
+
+
+@pytest.mark.asyncio
+async def test_openai_semantic_cache_miss(mock_openai_client):
+    mock_response = AsyncMock()
+    mock_response.choices = [Mock(message=Mock(content="1"))]
+    mock_openai_client.chat.completions.create.return_value = mock_response
+    semantic_cache = _llm.SemanticCache(embedding_func=mock_prompt_embedding)
+
+    await _llm.gpt_4o_complete("hello world", semantic_cache=semantic_cache)
+    # not similar enough
+    await _llm.gpt_4o_complete("bye world", semantic_cache=semantic_cache)
+    # similar, but under another system prompt
+    await _llm.gpt_4o_complete(
+        "hello world", system_prompt="3", semantic_cache=semantic_cache
+    )
+
+    assert mock_openai_client.chat.completions.create.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_azure_openai_semantic_cache_hit(mock_azure_openai_client):
+    mock_response = AsyncMock()
+    mock_response.choices = [Mock(message=Mock(content="1"))]
+    mock_azure_openai_client.chat.completions.create.return_value = mock_response
+    semantic_cache = _llm.SemanticCache(embedding_func=mock_prompt_embedding)
+
+    first = await _llm.azure_gpt_4o_complete(
+        "hello world", semantic_cache=semantic_cache
+    )
+    second = await _llm.azure_gpt_4o_complete(
+        "hello  world!", semantic_cache=semantic_cache
+    )
+
+    assert first == second == "1"
+    mock_azure_openai_client.chat.completions.create.assert_awaited_once()
+
+
+def test_amazon_bedrock_runtime_per_event_loop():
+    contexts = []
+
+    def client(*args, **kwargs):
+        contexts.append(AsyncMock())
+        return contexts[-1]
+
+    session = Mock()
+    session.client.side_effect = client
+
+    async def get_twice_and_close():
+        runtime = await _llm.get_amazon_bedrock_runtime_instance()
+        assert await _llm.get_amazon_bedrock_runtime_instance() is runtime
+        await _llm.close_amazon_bedrock_runtime()
+        return runtime
+
+    with patch(
+        "nano_graphrag._llm.get_amazon_bedrock_async_client_instance",
+        return_value=session,
+    ):
+        runtimes = [asyncio.run(get_twice_and_close()) for _ in range(2)]
+
+    # each loop enters its own client, closing the runtime exits its context
+    assert len(contexts) == 2 and runtimes[0] is not runtimes[1]
+    for context in contexts:
+        context.__aexit__.assert_awaited_once()
+    assert not _llm.global_amazon_bedrock_runtimes
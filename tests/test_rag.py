@@ -3,7 +3,7 @@ import json
 import shutil
 import numpy as np
 from nano_graphrag import GraphRAG, QueryParam
-from nano_graphrag._utils import wrap_embedding_func_with_attrs
+from nano_graphrag._utils import always_get_an_event_loop, wrap_embedding_func_with_attrs
 
 os.environ["OPENAI_API_KEY"] = "FAKE"
 
@@ -99,3 +99,51 @@ def test_subcommunity_insert():
         addon_params={"force_to_use_sub_communities": True},
     )
     rag.insert(FAKE_TEXT)
+
+
+def test_semantic_llm_cache_only_on_query_answers():
+    received = []
+
+    async def recording_model(prompt, system_prompt=None, history_messages=[], **kwargs):
+        received.append(kwargs)
+        return FAKE_RESPONSE
+
+    # custom model funcs never get the kwarg, they may forward kwargs to their client
+    rag = GraphRAG(
+        working_dir=WORKING_DIR,
+        best_model_func=recording_model,
+        embedding_func=local_embedding,
+        enable_semantic_llm_cache=True,
+    )
+    loop = always_get_an_event_loop()
+    loop.run_until_complete(rag.best_model_query_func("hello"))
+    assert rag.semantic_llm_cache is None and "semantic_cache" not in received[-1]
+
+    recording_model.supports_semantic_cache = True
+    rag = GraphRAG(
+        working_dir=WORKING_DIR,
+        best_model_func=recording_model,
+        cheap_model_func=recording_model,
+        embedding_func=local_embedding,
+        enable_semantic_llm_cache=True,
+        semantic_llm_cache_threshold=0.9,
+    )
+    assert rag.semantic_llm_cache.similarity_threshold == 0.9
+    # extraction, summaries and reports share long templates, they only use the exact cache
+    loop.run_until_complete(rag.best_model_func("hello"))
+    loop.run_until_complete(rag.cheap_model_func("hello"))
+    assert all("semantic_cache" not in kwargs for kwargs in received[-2:])
+    loop.run_until_complete(rag.best_model_query_func("hello"))
+    assert received[-1]["semantic_cache"] is rag.semantic_llm_cache
+
+
+def test_query_param_naive_max_token_is_a_field():
+    assert QueryParam(naive_max_token_for_text_unit=100).naive_max_token_for_text_unit == 100
+
+
+def test_config_sees_in_place_edits_and_wrapped_funcs():
+    rag = GraphRAG(working_dir=WORKING_DIR, embedding_func=local_embedding)
+    rag.addon_params["neo4j_url"] = "neo4j://localhost"
+    assert rag._config["addon_params"]["neo4j_url"] == "neo4j://localhost"
+    assert rag._config["best_model_func"] is rag.best_model_func
+    assert rag._config["embedding_func"] is rag.embedding_func
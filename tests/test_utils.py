@@ -0,0 +1,183 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from nano_graphrag import _utils
+from nano_graphrag._storage import JsonKVStorage
+from nano_graphrag._utils import (
+    cached_embedding,
+    coalesce_async_func_call,
+    compute_mdhash_id,
+    cosine_similarity,
+    dequantize_int8,
+    load_json,
+    quantize_int8,
+    wrap_embedding_func_with_attrs,
+    write_json,
+)
+
+
+@pytest.mark.parametrize("use_simsimd", [True, False])
+def test_cosine_similarity(monkeypatch, use_simsimd):
+    if use_simsimd and _utils.simsimd is None:
+        pytest.skip("simsimd is not installed")
+    if not use_simsimd:
+        monkeypatch.setattr(_utils, "simsimd", None)
+    rng = np.random.default_rng(0)
+    query = rng.random(16, dtype=np.float32)
+    matrix = rng.random((8, 16), dtype=np.float32)
+
+    expected = (matrix @ query) / (
+        np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    )
+    assert np.allclose(cosine_similarity(query, matrix), expected, atol=1e-5)
+    assert cosine_similarity(query, matrix[:0]).shape == (0,)
+
+
+def test_quantize_int8():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((8, 384)).astype(np.float32)
+    embeddings[0] = 0
+
+    codes, scales = quantize_int8(embeddings)
+
+    assert codes.dtype == np.int8 and scales.shape == (8,)
+    assert np.allclose(dequantize_int8(codes, scales), embeddings, atol=scales.max())
+    # cosine on the codes is close to cosine on the original vectors
+    assert np.allclose(
+        cosine_similarity(codes[1], codes[1:]),
+        cosine_similarity(embeddings[1], embeddings[1:]),
+        atol=1e-2,
+    )
+
+
+def test_write_and_load_json(tmp_path):
+    file_name = str(tmp_path / "data.json")
+    write_json({"名字": {"content": "中文", "n": 1}, 2: [0.5]}, file_name)
+
+    # stays readable: indented and no ascii escaping, non-str keys become strings
+    raw = open(file_name, encoding="utf-8").read()
+    assert '"名字"' in raw and "\n  " in raw
+    assert load_json(file_name) == {"名字": {"content": "中文", "n": 1}, "2": [0.5]}
+    assert load_json(str(tmp_path / "missing.json")) is None
+
+
+def test_compute_mdhash_id():
+    assert compute_mdhash_id("hello", prefix="doc-") == "doc-5d41402abc4b2a76b9719d911017c592"
+    blake2b_id = compute_mdhash_id("hello", hash="blake2b")
+    assert len(blake2b_id) == 32 and blake2b_id != compute_mdhash_id("hello")
+    with pytest.raises(ValueError):
+        compute_mdhash_id("hello", hash="sha1")
+
+
+@pytest.mark.asyncio
+async def test_cached_embedding(tmp_path):
+    calls = []
+
+    @wrap_embedding_func_with_attrs(embedding_dim=2, max_token_size=8192)
+    async def mock_embedding(texts: list[str]) -> np.ndarray:
+        calls.append(texts)
+        return np.array([[len(t), 1.0] for t in texts])
+
+    cache = JsonKVStorage(
+        namespace="embedding_cache", global_config={"working_dir": str(tmp_path)}
+    )
+    embedding_func = cached_embedding(cache, mock_embedding)
+    assert embedding_func.embedding_dim == 2
+
+    first = await embedding_func(["a", "bb", "a"])
+    second = await embedding_func(["bb", "ccc"])
+
+    # repeated texts are embedded once, in and across calls
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert first.dtype == np.float32
+    assert np.allclose(first, [[1, 1], [2, 1], [1, 1]])
+    assert np.allclose(second, [[2, 1], [3, 1]])
+
+
+
+@pytest.mark.asyncio
+async def test_cached_embedding_cache_key(tmp_path):
+    def make_model(value):
+        @wrap_embedding_func_with_attrs(embedding_dim=2, max_token_size=8192)
+        async def local_embedding(texts: list[str]) -> np.ndarray:
+            return np.array([[value, 1.0] for _ in texts])
+
+        return local_embedding
+
+    cache = JsonKVStorage(
+        namespace="embedding_cache", global_config={"working_dir": str(tmp_path)}
+    )
+    old = cached_embedding(cache, make_model(1.0), cache_key="model-a")
+    new = cached_embedding(cache, make_model(2.0), cache_key="model-b")
+
+    # same function name and dimension, the cache key keeps the models apart
+    assert np.allclose(await old(["a"]), [[1, 1]])
+    assert np.allclose(await new(["a"]), [[2, 1]])
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("quantize, atol", [("float16", 1e-3), ("int8", 1e-2)])
+async def test_cached_embedding_quantize(tmp_path, quantize, atol):
+    @wrap_embedding_func_with_attrs(embedding_dim=4, max_token_size=8192)
+    async def mock_embedding(texts: list[str]) -> np.ndarray:
+        return np.array([[0.1, -0.5, 0.25, 1.0] for _ in texts])
+
+    cache = JsonKVStorage(
+        namespace="embedding_cache", global_config={"working_dir": str(tmp_path)}
+    )
+    embedding_func = cached_embedding(cache, mock_embedding, quantize=quantize)
+    await embedding_func(["a"])
+
+    (key,) = await cache.all_keys()
+    assert (await cache.get_by_id(key))["dtype"] == quantize
+    cached = await embedding_func(["a"])
+    assert cached.dtype == np.float32
+    assert np.allclose(cached, [[0.1, -0.5, 0.25, 1.0]], atol=atol)
+
+    with pytest.raises(ValueError):
+        cached_embedding(cache, mock_embedding, quantize="int4")
+
+
+@pytest.mark.asyncio
+async def test_coalesce_async_func_call():
+    calls = []
+
+    @coalesce_async_func_call(max_batch_size=4, max_wait_time=0.01)
+    async def mock_embedding(texts: list[str]) -> np.ndarray:
+        calls.append(texts)
+        return np.array([[len(t)] for t in texts])
+
+    results = await asyncio.gather(
+        mock_embedding(["a", "bb"]), mock_embedding(["ccc"]), mock_embedding(["dddd"])
+    )
+    # the first three texts wait for company, the fourth fills the batch
+    assert calls == [["a", "bb", "ccc", "dddd"]]
+    assert [r.ravel().tolist() for r in results] == [[1, 2], [3], [4]]
+
+    result = await mock_embedding(["eeeee"])
+    assert calls[-1] == ["eeeee"] and result.ravel().tolist() == [5]
+
+
+def test_always_get_an_event_loop_uses_uvloop():
+    uvloop = pytest.importorskip("uvloop")
+    loops = []
+    # a fresh thread has no event loop, so one gets created
+    thread = threading.Thread(target=lambda: loops.append(_utils.always_get_an_event_loop()))
+    thread.start()
+    thread.join()
+    assert isinstance(loops[0], uvloop.Loop)
+    assert loops[0].run_until_complete(asyncio.sleep(0, result=1)) == 1
+    loops[0].close()
+
+
+def test_always_get_an_event_loop_keeps_current_loop():
+    policy = asyncio.get_event_loop_policy()
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        assert _utils.always_get_an_event_loop() is loop
+        assert asyncio.get_event_loop_policy() is policy
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()